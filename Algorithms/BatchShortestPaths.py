@@ -0,0 +1,125 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+from numpy.lib.format import open_memmap
+from Algorithms.CSRGraph import CSRGraph
+from Algorithms.DijkstrasAlgorithm import dijkstraSearch
+
+"""
+Shortest path distances from many sources at once, spread over a pool of worker processes. The arrays of the CSR graph
+are copied once into shared memory, and every worker maps them read only when it starts, so the graph is neither
+pickled for every task nor copied into every worker. The sources are handed out in chunks of chunkSize, and each worker
+runs dijkstraSearch from every source of its chunk and sends back that block of rows of the distance table. At most two
+chunks per worker are in flight at any time, so memory only depends on the chunk size and the output.
+"""
+
+#the graph as seen by a worker process, set up by initWorker.
+workerGraph = None
+workerMemory = []
+
+#attaches to the shared memory blocks holding the offsets, targets and weights of the graph. specs holds the name, shape
+#and dtype of each block.
+def initWorker(specs,directed):
+    global workerGraph,workerMemory
+    arrays = []
+    for name,shape,dtype in specs:
+        block = shared_memory.SharedMemory(name = name)
+        workerMemory.append(block)
+        arrays.append(np.ndarray(shape,dtype = dtype,buffer = block.buf))
+    workerGraph = CSRGraph.fromCSR(arrays[0],arrays[1],arrays[2],directed)
+
+#the distances from every vertex number in sources to every vertex, as a len(sources) x V array with inf for the
+#vertices that cannot be reached (or are further than maxDistance).
+def solveChunk(sources,maxDistance,graph = None):
+    graph = workerGraph if graph is None else graph
+    rows = np.full((len(sources),graph.numVertices()),np.inf)
+    for i,s in enumerate(sources):
+        distances,predecessors = dijkstraSearch(graph,[s],None,maxDistance)
+        rows[i,list(distances.keys())] = list(distances.values())
+    return rows
+
+#copies an array into a new shared memory block, and returns the block along with what a worker needs to find it.
+def share(array):
+    block = shared_memory.SharedMemory(create = True,size = max(array.nbytes,1))
+    np.ndarray(array.shape,dtype = array.dtype,buffer = block.buf)[:] = array
+    return block,(block.name,array.shape,array.dtype.str)
+
+"""
+Computes the shortest path distances from every node in sources (given by name) to every vertex of the CSRGraph csr.
+The costs must not be negative. output is one of:
+    -dense: returns a len(sources) x V array, with inf where there is no path.
+    -sparse: returns three arrays (row, column and distance) holding only the pairs that have a path, like a COO matrix.
+    -file: writes the rows into a .npy file called fileName as they come in, and returns it opened as a memmap.
+With workers set to 1 (or None) everything runs in this process, which is handy for small jobs and for debugging.
+"""
+def batchShortestPaths(csr,sources,workers = None,chunkSize = 64,output = "dense",fileName = None,maxDistance = None):
+    if output not in ("dense","sparse","file"):
+        raise ValueError("output must be dense, sparse or file, not {0}.".format(output))
+    if output == "file" and fileName is None:
+        raise ValueError("output = file needs a fileName to write the distances to.")
+    if chunkSize < 1:
+        raise ValueError("chunkSize must be at least 1.")
+    if csr.numEdges() > 0 and csr.weights.min() < 0:
+        raise ValueError("Dijkstra's algorithm needs costs that are not negative.")
+    sources = np.array([csr.ids[s] for s in sources],dtype = np.int64)
+    chunks = [sources[i:i + chunkSize] for i in range(0,len(sources),chunkSize)]
+    starts = list(range(0,len(sources),chunkSize))
+    if output == "file":
+        result = open_memmap(fileName,mode = "w+",dtype = np.float64,shape = (len(sources),csr.numVertices()))
+    elif output == "dense":
+        result = np.empty((len(sources),csr.numVertices()))
+    else:
+        result = []
+
+    def store(k,rows):
+        if output == "sparse":
+            r,c = np.nonzero(np.isfinite(rows))
+            result.append((r + starts[k],c,rows[r,c]))
+        else:
+            result[starts[k]:starts[k] + len(rows)] = rows
+
+    if workers is None or workers <= 1:
+        for k,chunk in enumerate(chunks):
+            store(k,solveChunk(chunk,maxDistance,csr))
+    else:
+        blocks = []
+        try:
+            specs = []
+            for array in (csr.offsets,csr.targets,csr.weights):
+                block,spec = share(np.ascontiguousarray(array))
+                blocks.append(block)
+                specs.append(spec)
+            with ProcessPoolExecutor(max_workers = workers,initializer = initWorker,
+                                     initargs = (specs,csr.directed)) as executor:
+                pending = {}
+                waiting = list(enumerate(chunks))[::-1]
+                while len(waiting) > 0 or len(pending) > 0:
+                    while len(waiting) > 0 and len(pending) < 2*workers:
+                        k,chunk = waiting.pop()
+                        pending[executor.submit(solveChunk,chunk,maxDistance)] = k
+                    done,others = wait(pending,return_when = FIRST_COMPLETED)
+                    for future in done:
+                        store(pending.pop(future),future.result())
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    if output == "sparse":
+        if len(result) == 0:
+            return np.zeros(0,dtype = np.int64),np.zeros(0,dtype = np.int64),np.zeros(0)
+        return tuple(np.concatenate(x) for x in zip(*result))
+    if output == "file":
+        result.flush()
+    return result
+
+if __name__ == '__main__':
+    import time
+    from Algorithms import RandomGraphs as rg
+    n = 20000
+    g = rg.toGraph(n,*rg.erdosRenyi(n,5/n,seed = 0),low = 1,high = 20,seed = 0)
+    sources = list(range(64))
+    for workers in (1,4):
+        started = time.time()
+        table = batchShortestPaths(g,sources,workers = workers,chunkSize = 8)
+        print("{0} worker(s): {1} sources in {2:.2f}s".format(workers,len(sources),time.time() - started))
@@ -1,39 +1,158 @@
-import random
+from collections import deque
+import numpy as np
+from Algorithms import RandomGraphs as rg
 
 class Graph:
     def __init__(self,nodes,edges):
-        self.nodes = nodes
-        self.edges = edges
+        self.nodes = list(nodes)
+        self.edges = list(edges)
+        self.version = 0
     def numNodes(self):
         return len(self.nodes)
+    #every change to the graph goes up the version, so that cached results from an earlier version can tell.
+    def addEdge(self,a,b,cost):
+        for x in (a,b):
+            if x not in self.nodes:
+                self.nodes.append(x)
+        self.edges.append((a,b,cost))
+        self.version += 1
+    def removeEdge(self,a,b):
+        self.edges = [e for e in self.edges if e[0] != a or e[1] != b]
+        self.version += 1
 
-def createRandomGraph(n,directed):
+#a random graph on the nodes 1 to n, where each pair of nodes i < j has an edge from i to j with probability just under
+#one half (and back again if the graph is undirected), with a cost from -20 to 50.
+def createRandomGraph(n,directed,seed = None):
     nodes = [x+1 for x in range(n)]
-    edges = []
-    for i in nodes:
-        for j in [y for y in nodes if y > i]:
-            r1 = random.random()
-            r2 = random.random()
-            if r1 > .005 + r2:
-                weight = random.randint(-20,50)
-                edges.append((i,j,weight))
+    rng = np.random.default_rng(seed)
+    sources,targets = rg.erdosRenyi(n,.995**2/2,False,rng)
+    weights = rng.integers(-20,51,size = len(sources))
+    edges = list(zip((sources + 1).tolist(),(targets + 1).tolist(),weights.tolist()))
     if not directed:
-        add = []
-        for e in edges:
-            add.append((e[1],e[0],e[2]))
-    edges.extend(add)
+        edges.extend([(e[1],e[0],e[2]) for e in edges])
     g = Graph(nodes,edges)
     return g
 
+"""
+Helper function that looks for a cycle among the predecessors found by Bellman-Ford, where predecessors[v] is the index
+of the vertex before v (or -1). Every vertex has at most one predecessor, so we can follow them from each vertex in turn,
+marking what we pass, and stop at a vertex we have already been through. If it was marked on this walk, we have gone
+around a cycle. Any cycle among the predecessors has a negative total cost. Returns the indices on the cycle in the
+direction of its edges, or None.
+"""
+def predecessorCycle(predecessors):
+    marks = [-1]*len(predecessors)
+    for start in range(len(predecessors)):
+        v = start
+        while v != -1 and marks[v] == -1:
+            marks[v] = start
+            v = predecessors[v]
+        if v != -1 and marks[v] == start:
+            cycle = [v]
+            u = predecessors[v]
+            while u != v:
+                cycle.append(u)
+                u = predecessors[u]
+            return cycle[::-1]
+    return None
+
+#Bellman-Ford in passes over the edges, stopping as soon as a pass makes no change. If the nth pass still makes one,
+#there is a negative cycle.
+def relaxInPasses(n,sources,targets,weights,s):
+    distances = [float("inf")]*n
+    predecessors = [-1]*n
+    distances[s] = 0
+    for i in range(n):
+        changed = False
+        for u,v,w in zip(sources,targets,weights):
+            if distances[u] + w < distances[v]:
+                distances[v] = distances[u] + w
+                predecessors[v] = u
+                changed = True
+        if not changed:
+            return distances,predecessors,False
+    return distances,predecessors,True
+
+#the Shortest Path Faster Algorithm: a queue holds the vertices whose distance has gone down, and only their edges are
+#relaxed. The number of edges on the path to every vertex is tracked, and if one reaches n there is a negative cycle.
+def relaxWithQueue(n,sources,targets,weights,s):
+    adjacency = [[] for v in range(n)]
+    for u,v,w in zip(sources,targets,weights):
+        adjacency[u].append((v,w))
+    distances = [float("inf")]*n
+    predecessors = [-1]*n
+    lengths = [0]*n
+    queued = bytearray(n)
+    distances[s] = 0
+    q = deque([s])
+    queued[s] = 1
+    while len(q) > 0:
+        u = q.popleft()
+        queued[u] = 0
+        for v,w in adjacency[u]:
+            if distances[u] + w < distances[v]:
+                distances[v] = distances[u] + w
+                predecessors[v] = u
+                lengths[v] = lengths[u] + 1
+                if lengths[v] >= n:
+                    return distances,predecessors,True
+                if not queued[v]:
+                    queued[v] = 1
+                    q.append(v)
+    return distances,predecessors,False
+
+#Bellman-Ford with every pass done at once over arrays of the edges: each edge offers its source's distance plus its
+#cost, and np.minimum.at keeps the smallest offer for each sink.
+def relaxVectorized(n,sources,targets,weights,s):
+    sources = np.asarray(sources,dtype = np.int64)
+    targets = np.asarray(targets,dtype = np.int64)
+    weights = np.asarray(weights,dtype = np.float64)
+    distances = np.full(n,np.inf)
+    predecessors = np.full(n,-1,dtype = np.int64)
+    distances[s] = 0
+    for i in range(n):
+        offers = distances[sources] + weights
+        better = offers < distances[targets]
+        if not better.any():
+            return distances.tolist(),predecessors.tolist(),False
+        updated = distances.copy()
+        np.minimum.at(updated,targets[better],offers[better])
+        best = better & (offers == updated[targets])
+        predecessors[targets[best]] = sources[best]
+        distances = updated
+    return distances.tolist(),predecessors.tolist(),True
+
+"""
+Runs Bellman-Ford on g from the node src. mode is one of:
+    -passes: passes over the edge list as usual, but stopping once a pass changes nothing.
+    -queue: the Shortest Path Faster Algorithm (SPFA), which only relaxes the edges out of vertices that changed.
+    -vectorized: passes over numpy arrays of the edges, which is much faster for big graphs.
+Returns three lists: the distances to the nodes (in the order of g.nodes, with inf if they cannot be reached), the node
+before each one on its shortest path (None for src and the ones that cannot be reached), and the nodes on a negative
+cycle in order (None if there is none). If there is a negative cycle, the distances are not meaningful.
+"""
+def BellmanFordPaths(g,src,mode = "passes"):
+    index = {v: i for i,v in enumerate(g.nodes)}
+    sources = [index[e[0]] for e in g.edges]
+    targets = [index[e[1]] for e in g.edges]
+    weights = [e[2] for e in g.edges]
+    relax = {"passes": relaxInPasses,"queue": relaxWithQueue,"vectorized": relaxVectorized}[mode]
+    distances,predecessors,negative = relax(g.numNodes(),sources,targets,weights,index[src])
+    cycle = None
+    if negative:
+        cycle = predecessorCycle(predecessors)
+        if cycle is None:
+            distances,predecessors,negative = relaxInPasses(g.numNodes(),sources,targets,weights,index[src])
+            cycle = predecessorCycle(predecessors)
+        cycle = [g.nodes[v] for v in cycle]
+    if mode == "vectorized" and all(isinstance(w,int) for w in weights):
+        distances = [d if d == float("inf") else int(d) for d in distances]
+    return distances,[None if p == -1 else g.nodes[p] for p in predecessors],cycle
+
 def BellmanFord(g,src):
-    distances = [float("inf") if x != src else 0 for x in g.nodes]
-    for i in range(g.numNodes()-1):
-        for edge in g.edges:
-            if distances[edge[0]-1] != float("inf") and distances[edge[0]-1] + edge[2] < distances[edge[1]-1]:
-                distances[edge[1]-1] = distances[edge[0]-1] + edge[2]
-    for edge in g.edges:
-        if distances[edge[0]-1] != float("inf") and distances[edge[0] - 1] + edge[2] < distances[edge[1] - 1]:
-            print("The graph contains a negative cycle.")
+    distances,predecessors,cycle = BellmanFordPaths(g,src)
+    if cycle is not None:
+        print("The graph contains a negative cycle.")
     return distances
 
 if __name__ == '__main__':
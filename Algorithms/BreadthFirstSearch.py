@@ -1,40 +1,200 @@
+import numpy as np
 from Algorithms import DataStructures as ds
+from Algorithms.CSRGraph import CSRGraph
 
 """
-This is a class for storing a weighted graph, with E edges and V vertices. To do this, we store the nodes
-in a dictionary where the keys are the node names and the values are an adjacency list. Each element in the adjacency
-list stores tuples, where the first element is the adjoining vertex and the second element is the cost of the edge.
-We also store a third argument indicating whether or not the graph is directed. If it is, then we will assume that the
-pairs in edges are of the form [source, sink, cost].
+Breadth first search on a CSRGraph from vertex number v0. Whether a vertex has been seen is kept in a bytearray with one
+entry per vertex, and every vertex goes through the queue once, so this is O(V+E). Returns the vertices in the order
+they were discovered, along with lists holding the number of hops from v0 (-1 if it cannot be reached) and the parent
+in the search tree (-1 for v0 and for vertices that cannot be reached) of every vertex.
+"""
+def bfsSearch(csr,v0):
+    n = csr.numVertices()
+    seen = bytearray(n)
+    hops = [-1]*n
+    parents = [-1]*n
+    order = [v0]
+    seen[v0] = 1
+    hops[v0] = 0
+    q = ds.Queue()
+    q.enqueue(v0)
+    while q.size() > 0:
+        v = q.dequeue()
+        for u in csr.neighbors(v)[0].tolist():
+            if not seen[u]:
+                seen[u] = 1
+                hops[u] = hops[v] + 1
+                parents[u] = v
+                order.append(u)
+                q.enqueue(u)
+    return order,hops,parents
+
+"""
+Bidirectional breadth first search for a shortest path (by number of edges) between vertex numbers s and t. We search
+forwards from s along the edges of csr and backwards from t along the edges of reverse (its reverse graph) at the same
+time, always growing whichever side has the smaller frontier by one whole level. The first level that reaches a vertex
+the other side has seen contains a shortest path, and we take the best meeting point in it. On a big graph the two
+searches only need to go about half as deep, so they see far fewer vertices than a search from s would; for the same
+reason the parents are kept in dictionaries rather than in lists over every vertex. Returns the path as a list of
+vertex numbers (empty if t cannot be reached) and the number of vertices that were seen.
+"""
+def bidirectionalSearch(csr,reverse,s,t):
+    if s == t:
+        return [s],1
+    forward = {s: (-1,0)}
+    backward = {t: (-1,0)}
+    forwardLevel = [s]
+    backwardLevel = [t]
+    while len(forwardLevel) > 0 and len(backwardLevel) > 0:
+        if len(forwardLevel) <= len(backwardLevel):
+            graph,level,mine,other = csr,forwardLevel,forward,backward
+        else:
+            graph,level,mine,other = reverse,backwardLevel,backward,forward
+        nextLevel = []
+        meet = None
+        for v in level:
+            hops = mine[v][1] + 1
+            for u in graph.neighbors(v)[0].tolist():
+                if u not in mine:
+                    mine[u] = (v,hops)
+                    nextLevel.append(u)
+                    if u in other and (meet is None or other[u][1] < other[meet][1]):
+                        meet = u
+        if meet is not None:
+            path = [meet]
+            while forward[path[-1]][0] != -1:
+                path.append(forward[path[-1]][0])
+            path.reverse()
+            while backward[path[-1]][0] != -1:
+                path.append(backward[path[-1]][0])
+            return path,len(forward) + len(backward)
+        if level is forwardLevel:
+            forwardLevel = nextLevel
+        else:
+            backwardLevel = nextLevel
+    return [],len(forward) + len(backward)
+
+"""
+Helper function for bfsLevels that gathers the out-edges of every vertex in vertices at once, without a Python loop.
+Returns the sink of every edge along with the position (in vertices) of the vertex it comes out of.
+"""
+def gatherEdges(csr,vertices):
+    starts = csr.offsets[vertices]
+    counts = csr.offsets[vertices + 1] - starts
+    owners = np.repeat(np.arange(len(vertices)),counts)
+    firsts = np.cumsum(counts) - counts
+    return csr.targets[np.arange(len(owners)) - firsts[owners] + starts[owners]],owners
+
+"""
+Level synchronous breadth first search on a CSRGraph from vertex number v0, which finds a whole level of the search at a
+time with array operations instead of going through the vertices one by one. It gives the same hop counts as bfsSearch,
+but for big graphs it is much faster. Each level is found in one of two ways (Beamer, Asanovic and Patterson):
+    -top down: gather every edge out of the current frontier, and keep the sinks that have not been seen yet.
+    -bottom up: for every vertex that has not been seen yet, look through its in-edges (using reverse) for one that comes
+     from the frontier. A vertex can stop looking as soon as it finds one, so we check the first in-edge of every vertex
+     that is left, then the second of those that are still looking and so on, and gather whatever is left after a few
+     rounds in one go.
+Bottom up pays off when the edges out of the frontier are more than 1/alpha of the in-edges of the vertices that have
+not been seen, and we switch back to top down once the frontier shrinks below 1/beta of the vertices. Returns arrays
+holding the number of hops from v0 (-1 if it cannot be reached) and a parent in the search tree (-1 for v0 and for
+vertices that cannot be reached).
+"""
+def bfsLevels(csr,v0,reverse = None,alpha = 14,beta = 24,rounds = 4):
+    n = csr.numVertices()
+    reverse = csr.reverse() if reverse is None else reverse
+    seen = np.zeros(n,dtype = bool)
+    hops = np.full(n,-1,dtype = np.int64)
+    parents = np.full(n,-1,dtype = np.int64)
+    degrees = np.diff(csr.offsets)
+    inDegrees = np.diff(reverse.offsets)
+    frontier = np.array([v0],dtype = np.int64)
+    seen[v0] = True
+    hops[v0] = 0
+    edgesLeft = reverse.numEdges() - inDegrees[v0]
+    bottomUp = False
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        if not bottomUp and degrees[frontier].sum() > edgesLeft/alpha:
+            bottomUp = True
+        elif bottomUp and len(frontier) < n/beta:
+            bottomUp = False
+        if bottomUp:
+            inFrontier = np.zeros(n,dtype = bool)
+            inFrontier[frontier] = True
+            looking = np.flatnonzero(~seen)
+            found,foundParents = [np.zeros(0,dtype = np.int64)],[np.zeros(0,dtype = np.int64)]
+            for k in range(rounds):
+                looking = looking[inDegrees[looking] > k]
+                candidates = reverse.targets[reverse.offsets[looking] + k]
+                hit = inFrontier[candidates]
+                found.append(looking[hit])
+                foundParents.append(candidates[hit])
+                looking = looking[~hit]
+            if len(looking) > 0:
+                candidates,owners = gatherEdges(reverse,looking)
+                hit = inFrontier[candidates]
+                owners,first = np.unique(owners[hit],return_index = True)
+                found.append(looking[owners])
+                foundParents.append(candidates[hit][first])
+            frontier = np.concatenate(found)
+            parents[frontier] = np.concatenate(foundParents)
+        else:
+            sinks,owners = gatherEdges(csr,frontier)
+            new = ~seen[sinks]
+            previous = frontier
+            frontier,first = np.unique(sinks[new],return_index = True)
+            parents[frontier] = previous[owners[new][first]]
+        seen[frontier] = True
+        hops[frontier] = level
+        edgesLeft -= inDegrees[frontier].sum()
+    return hops,parents
+
+"""
+This is a class for storing a weighted graph, with E edges and V vertices. To do this, we store the graph in compressed
+sparse row form (see CSRGraph), where the nodes are numbered and the edges out of each node are stored next to each other
+along with their costs. The adjacency list of a node is a list of tuples, where the first element is the adjoining vertex
+and the second element is the cost of the edge. We also store a third argument indicating whether or not the graph is
+directed. If it is, then we will assume that the pairs in edges are of the form [source, sink, cost].
 """
 class Graph:
     #nodes is a list of names, and edges is a list of tuples with the following form: [node1, node2, value for edge]
     def __init__(self,nodes,edges,directed = True):
-        if directed:
-            self._adj = {y: [(x[1],x[2]) for x in set(edges) if y == x[0]] for y in set(nodes)}
-        else:
-            self._adj = {y: [(x[0],x[2]) if x[1] == y else (x[1],x[2]) for x in set(edges) if y in (x[0],x[1])] for y in set(nodes)}
+        self._csr = CSRGraph(nodes,edges,directed)
+
+    #a graph that works straight on csr, a CSRGraph that has already been built (or mapped from a file with
+    #GraphFile.readGraph), without copying it.
+    @classmethod
+    def fromCSR(cls,csr):
+        g = cls.__new__(cls)
+        g._csr = csr
+        return g
 
     def numVertices(self):
-        return len(self._adj.keys())
+        return self._csr.numVertices()
 
     def printGraph(self):
-        for a in self._adj.keys():
-            for b in  self._adj[a]:
-                print('{0} -> {1} with edge weight = {2}'.format(a,b[0],b[1]))
+        self._csr.printGraph()
 
+    #the nodes in the order they are discovered from v0, along with the number of hops from v0 to each of them.
     def breadthFirstSearch(self,v0):
-        counter = 0
-        layers = [counter]
-        disc = [v0]
-        q = ds.Queue()
-        q.enqueue(v0)
-        while q.size() > 0:
-            v = q.dequeue()
-            counter += 1
-            for neighbor in self._adj[v]:
-                if neighbor[0] not in disc:
-                    q.enqueue(neighbor[0])
-                    disc.append(neighbor[0])
-                    layers.append(counter)
-        return disc,layers
+        order,hops,parents = bfsSearch(self._csr,self._csr.ids[v0])
+        return [self._csr.names[v] for v in order],[hops[v] for v in order]
+
+    #the number of hops from v0 to every node that can be reached from it, and the parent of each one in the search tree
+    #(None for v0).
+    def hopDistances(self,v0):
+        names = self._csr.names
+        order,hops,parents = bfsSearch(self._csr,self._csr.ids[v0])
+        return {names[v]: hops[v] for v in order},{names[v]: None if parents[v] == -1 else names[parents[v]] for v in order}
+
+    #the number of hops from v0 to every node, as an array in the same order as the nodes of the CSR graph (-1 for the
+    #ones that cannot be reached), found a level at a time with bfsLevels. This is the one to use for big graphs.
+    def breadthFirstLevels(self,v0):
+        return bfsLevels(self._csr,self._csr.ids[v0])[0]
+
+    #a path from v0 to target with as few edges as possible, as a list of nodes (empty if there is none), found with a
+    #bidirectional search.
+    def shortestUnweightedPath(self,v0,target):
+        path,seen = bidirectionalSearch(self._csr,self._csr.reverse(),self._csr.ids[v0],self._csr.ids[target])
+        return [self._csr.names[v] for v in path]
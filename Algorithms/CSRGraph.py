@@ -0,0 +1,155 @@
+import numpy as np
+
+"""
+This is a class for storing a weighted graph, with E edges and V vertices, in compressed sparse row (CSR) form. The
+vertices are numbered 0 to V-1, and names maps each number back to the name it was given (ids goes the other way). The
+out-edges of vertex v are stored next to each other: their sinks are targets[offsets[v]:offsets[v+1]] and their costs
+are the same slice of weights. Building this takes a couple of passes over the edges and a sort by source, rather than
+the O(V*E) of scanning every edge once per node.
+
+As with the other graph classes, edges is a list of tuples of the form (node1, node2, value for edge). Repeated edges
+are only stored once. If the graph is undirected, every edge is stored in both directions (self loops only once). Any
+node that only appears in an edge is added after the ones in nodes.
+"""
+class CSRGraph:
+    def __init__(self,nodes,edges,directed = True):
+        edges = list(dict.fromkeys(edges))
+        names = list(dict.fromkeys(nodes))
+        ids = {name: i for i,name in enumerate(names)}
+        for e in edges:
+            for name in (e[0],e[1]):
+                if name not in ids:
+                    ids[name] = len(names)
+                    names.append(name)
+        self._names = names
+        self._ids = ids
+        sources = np.fromiter((ids[e[0]] for e in edges),dtype = np.int64,count = len(edges))
+        targets = np.fromiter((ids[e[1]] for e in edges),dtype = np.int64,count = len(edges))
+        weights = np.array([e[2] for e in edges]) if len(edges) > 0 else np.zeros(0)
+        self._build(len(names),sources,targets,weights,directed)
+
+    #builds a graph straight from arrays of vertex numbers 0 to numVertices-1, without going through tuples. Unlike the
+    #constructor, repeated edges are kept. If names is not given, every vertex is named by its number, and it can also be
+    #a function that makes the list of names when they are first needed.
+    @classmethod
+    def fromArrays(cls,numVertices,sources,targets,weights = None,directed = True,names = None):
+        g = cls.__new__(cls)
+        g._names = names if names is None or callable(names) else list(names)
+        g._ids = None
+        sources = np.asarray(sources,dtype = np.int64)
+        targets = np.asarray(targets,dtype = np.int64)
+        weights = np.ones(len(sources)) if weights is None else np.asarray(weights)
+        g._build(numVertices,sources,targets,weights,directed)
+        return g
+
+    #wraps arrays that are already in CSR form (from another CSRGraph, shared memory or a file), without copying them.
+    #names works as for fromArrays.
+    @classmethod
+    def fromCSR(cls,offsets,targets,weights,directed = True,names = None):
+        g = cls.__new__(cls)
+        g._names = names if names is None or callable(names) else list(names)
+        g._ids = None
+        g.directed = directed
+        g.offsets = offsets
+        g.targets = targets
+        g.weights = weights
+        return g
+
+    #the names of the vertices, in order. A graph made from arrays may never need them, so they are only made (as the
+    #numbers of the vertices) when they are first asked for.
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = list(range(self.numVertices()))
+        elif callable(self._names):
+            self._names = list(self._names())
+        return self._names
+
+    #the number of every vertex, by name.
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = {name: i for i,name in enumerate(self.names)}
+        return self._ids
+
+    #the edges are put in order of their source with a stable sort (so edges keep the order they were given in), and
+    #the number of edges out of each vertex gives the offsets.
+    def _build(self,numVertices,sources,targets,weights,directed):
+        if not directed:
+            loops = sources == targets
+            sources,targets = np.concatenate([sources,targets[~loops]]),np.concatenate([targets,sources[~loops]])
+            weights = np.concatenate([weights,weights[~loops]])
+        order = np.argsort(sources,kind = "stable")
+        self.directed = directed
+        self.offsets = np.zeros(numVertices + 1,dtype = np.int64)
+        np.cumsum(np.bincount(sources,minlength = numVertices),out = self.offsets[1:])
+        self.targets = targets[order]
+        self.weights = weights[order]
+
+    def numVertices(self):
+        return len(self.offsets) - 1
+
+    #the number of stored edges, so an undirected edge counts twice.
+    def numEdges(self):
+        return len(self.targets)
+
+    def degree(self,v):
+        return self.offsets[v + 1] - self.offsets[v]
+
+    #the sinks and costs of the out-edges of vertex number v, as views into the arrays (nothing is copied).
+    def neighbors(self,v):
+        return self.targets[self.offsets[v]:self.offsets[v + 1]],self.weights[self.offsets[v]:self.offsets[v + 1]]
+
+    #the source of every stored edge, to go with targets and weights.
+    def sources(self):
+        return np.repeat(np.arange(self.numVertices()),np.diff(self.offsets))
+
+    #a new graph with the stored edges where keep is True (all of them if keep is None), plus the edges in edges, which
+    #are (node1, node2, value for edge) tuples as for the constructor and can bring in new nodes. Building it is O(V+E),
+    #so this is for occasional changes rather than many small ones.
+    def modified(self,edges = [],keep = None):
+        names = list(self.names)
+        ids = dict(self.ids)
+        for e in edges:
+            for name in (e[0],e[1]):
+                if name not in ids:
+                    ids[name] = len(names)
+                    names.append(name)
+        sources,targets,weights = self.sources(),self.targets,self.weights
+        if keep is not None:
+            sources,targets,weights = sources[keep],targets[keep],weights[keep]
+        newSources = [ids[e[0]] for e in edges]
+        newTargets = [ids[e[1]] for e in edges]
+        newWeights = [e[2] for e in edges]
+        if not self.directed:
+            loops = [e[0] == e[1] for e in edges]
+            newSources,newTargets,newWeights = (newSources + [t for t,l in zip(newTargets,loops) if not l],
+                                                newTargets + [s for s,l in zip(newSources,loops) if not l],
+                                                newWeights + [w for w,l in zip(newWeights,loops) if not l])
+        g = CSRGraph.fromArrays(len(names),np.concatenate([sources,np.array(newSources,dtype = np.int64)]),
+                                np.concatenate([targets,np.array(newTargets,dtype = np.int64)]),
+                                np.concatenate([weights,np.array(newWeights) if len(edges) > 0 else weights[:0]]),True,names)
+        g.directed = self.directed
+        return g
+
+    #the same graph with every edge turned around, so that neighbors gives the in-edges of a vertex. It is built once
+    #and kept, and an undirected graph is its own reverse.
+    def reverse(self):
+        if not self.directed:
+            return self
+        if getattr(self,"_reverse",None) is None:
+            sources = self.sources()
+            self._reverse = CSRGraph.fromArrays(self.numVertices(),self.targets,sources,self.weights,True,self._names)
+            self._reverse._reverse = self
+        return self._reverse
+
+    #the out-edges of the node called name, as a list of (name, cost) tuples.
+    def adjacency(self,name):
+        v = self.ids[name]
+        targets,weights = self.neighbors(v)
+        return [(self.names[t],w) for t,w in zip(targets.tolist(),weights.tolist())]
+
+    def printGraph(self):
+        for a in self.names:
+            for b in self.adjacency(a):
+                print('{0} -> {1} with edge weight = {2}'.format(a,b[0],b[1]))
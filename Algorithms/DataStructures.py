@@ -1,3 +1,5 @@
+from collections import deque
+
 # A simple class stack that only allows pop and push operations
 class Stack:
     def __init__(self):
@@ -14,11 +16,12 @@ class Stack:
     def size(self):
         return len(self.stack)
 
-# And a queue that only has enqueue and dequeue operations
+# And a queue that only has enqueue and dequeue operations. It is backed by a deque, since taking the first element
+# off a list moves everything after it.
 class Queue:
 
     def __init__(self):
-        self.queue = []
+        self.queue = deque()
 
     def enqueue(self, item):
         self.queue.append(item)
@@ -26,7 +29,7 @@ class Queue:
     def dequeue(self):
         if len(self.queue) < 1:
             return None
-        return self.queue.pop(0)
+        return self.queue.popleft()
 
     def size(self):
         return len(self.queue)
\ No newline at end of file
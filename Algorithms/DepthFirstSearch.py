@@ -1,36 +1,174 @@
-from Algorithms import DataStructures as ds
+from Algorithms.CSRGraph import CSRGraph
 
 """
-This is a class for storing a weighted graph, with E edges and V vertices. To do this, we store the nodes
-in a dictionary where the keys are the node names and the values are an adjacency list. Each element in the adjacency
-list stores tuples, where the first element is the adjoining vertex and the second element is the cost of the edge.
-We also store a third argument indicating whether or not the graph is directed. If it is, then we will assume that the
-pairs in edges are of the form [source, sink, cost].
+Iterative depth first search on a CSRGraph, so it works on graphs far too deep for recursion. Rather than pushing every
+neighbour onto the stack, the stack holds each vertex on the current path along with an iterator over its neighbours,
+and we pick up where we left off when we come back to it, so every edge is looked at once and the stack never holds more
+than the current path. Whether a vertex has been seen is kept in a bytearray. The search starts from each vertex of
+roots in turn that has not been seen yet (every vertex, if roots is None). Returns the vertices in the order they were
+discovered, and lists holding the discovery time, the finish time and the parent (-1 for roots, and for vertices that
+were not reached) of every vertex. The clock ticks once for every discovery and every finish, as in CLRS.
+"""
+def dfsSearch(csr,roots = None):
+    n = csr.numVertices()
+    seen = bytearray(n)
+    discovery = [-1]*n
+    finish = [-1]*n
+    parents = [-1]*n
+    order = []
+    clock = 0
+    for root in (range(n) if roots is None else roots):
+        if seen[root]:
+            continue
+        seen[root] = 1
+        discovery[root] = clock
+        clock += 1
+        order.append(root)
+        stack = [(root,iter(csr.neighbors(root)[0].tolist()))]
+        while len(stack) > 0:
+            v,neighbors = stack[-1]
+            for u in neighbors:
+                if not seen[u]:
+                    seen[u] = 1
+                    discovery[u] = clock
+                    clock += 1
+                    parents[u] = v
+                    order.append(u)
+                    stack.append((u,iter(csr.neighbors(u)[0].tolist())))
+                    break
+            else:
+                stack.pop()
+                finish[v] = clock
+                clock += 1
+    return order,discovery,finish,parents
+
+"""
+Topological order of a directed graph, from an iterative depth first search over every vertex: a vertex finishes only
+after everything it leads to has finished, so sorting by finish time, latest first, puts every edge forwards. Meeting
+an edge back to a vertex that is still on the stack means there is a cycle, in which case there is no topological order
+and we return None.
+"""
+def topologicalOrder(csr):
+    n = csr.numVertices()
+    state = bytearray(n)
+    finished = []
+    for root in range(n):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root,iter(csr.neighbors(root)[0].tolist()))]
+        while len(stack) > 0:
+            v,neighbors = stack[-1]
+            for u in neighbors:
+                if state[u] == 0:
+                    state[u] = 1
+                    stack.append((u,iter(csr.neighbors(u)[0].tolist())))
+                    break
+                if state[u] == 1:
+                    return None
+            else:
+                stack.pop()
+                state[v] = 2
+                finished.append(v)
+    return finished[::-1]
+
+"""
+Tarjan's algorithm for the strongly connected components of a directed graph, done iteratively. Every vertex gets an
+index in the order it is discovered, and a low link, which is the smallest index it can get back to through the vertices
+still waiting on the component stack. When a vertex finishes with its low link equal to its own index, it is the first
+vertex of a component, and everything above it on the component stack belongs to that component. Returns the number of
+components and a list holding the component of every vertex. Components are numbered in the order they are found, which
+is a reverse topological order of the graph of components.
+"""
+def tarjanComponents(csr):
+    n = csr.numVertices()
+    index = [-1]*n
+    low = [0]*n
+    onStack = bytearray(n)
+    components = [-1]*n
+    waiting = []
+    counter = 0
+    count = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        waiting.append(root)
+        onStack[root] = 1
+        stack = [(root,iter(csr.neighbors(root)[0].tolist()))]
+        while len(stack) > 0:
+            v,neighbors = stack[-1]
+            for u in neighbors:
+                if index[u] == -1:
+                    index[u] = low[u] = counter
+                    counter += 1
+                    waiting.append(u)
+                    onStack[u] = 1
+                    stack.append((u,iter(csr.neighbors(u)[0].tolist())))
+                    break
+                if onStack[u] and index[u] < low[v]:
+                    low[v] = index[u]
+            else:
+                stack.pop()
+                if len(stack) > 0 and low[v] < low[stack[-1][0]]:
+                    low[stack[-1][0]] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        u = waiting.pop()
+                        onStack[u] = 0
+                        components[u] = count
+                        if u == v:
+                            break
+                    count += 1
+    return count,components
+
+"""
+This is a class for storing a weighted graph, with E edges and V vertices. To do this, we store the graph in compressed
+sparse row form (see CSRGraph), where the nodes are numbered and the edges out of each node are stored next to each other
+along with their costs. The adjacency list of a node is a list of tuples, where the first element is the adjoining vertex
+and the second element is the cost of the edge. We also store a third argument indicating whether or not the graph is
+directed. If it is, then we will assume that the pairs in edges are of the form [source, sink, cost].
 """
 class Graph:
     #nodes is a list of names, and edges is a list of tuples with the following form: [node1, node2, value for edge]
     def __init__(self,nodes,edges,directed = True):
-        if directed:
-            self._adj = {y: [(x[1],x[2]) for x in set(edges) if y == x[0]] for y in set(nodes)}
-        else:
-            self._adj = {y: [(x[0],x[2]) if x[1] == y else (x[1],x[2]) for x in set(edges) if y in (x[0],x[1])] for y in set(nodes)}
+        self._csr = CSRGraph(nodes,edges,directed)
+
+    #a graph that works straight on csr, a CSRGraph that has already been built (or mapped from a file with
+    #GraphFile.readGraph), without copying it.
+    @classmethod
+    def fromCSR(cls,csr):
+        g = cls.__new__(cls)
+        g._csr = csr
+        return g
 
     def numVertices(self):
-        return len(self._adj.keys())
+        return self._csr.numVertices()
 
     def printGraph(self):
-        for a in self._adj.keys():
-            for b in  self._adj[a]:
-                print('{0} -> {1} with edge weight = {2}'.format(a,b[0],b[1]))
+        self._csr.printGraph()
 
+    #the nodes in the order they are discovered by a depth first search from v0.
     def depthFirstSearch(self,v0):
-        disc = []
-        s = ds.Stack()
-        s.push(v0)
-        while s.size() > 0:
-            v = s.pop()
-            if v not in disc:
-                disc.append(v)
-                for neighbor in self._adj[v]:
-                    s.push(neighbor[0])
-        return disc
+        order,discovery,finish,parents = dfsSearch(self._csr,[self._csr.ids[v0]])
+        return [self._csr.names[v] for v in order]
+
+    #the discovery and finish times of every node in a depth first search over the whole graph, as dictionaries.
+    def depthFirstTimes(self):
+        order,discovery,finish,parents = dfsSearch(self._csr)
+        names = self._csr.names
+        return {names[v]: discovery[v] for v in order},{names[v]: finish[v] for v in order}
+
+    #the nodes in topological order, or None if the graph has a cycle.
+    def topologicalSort(self):
+        order = topologicalOrder(self._csr)
+        return None if order is None else [self._csr.names[v] for v in order]
+
+    #the strongly connected components of the graph, as a list of lists of nodes.
+    def stronglyConnectedComponents(self):
+        count,components = tarjanComponents(self._csr)
+        grouped = [[] for c in range(count)]
+        for v,c in enumerate(components):
+            grouped[c].append(self._csr.names[v])
+        return grouped
@@ -1,42 +1,114 @@
+import heapq
 from Algorithms import DataStructures as ds
+from Algorithms.CSRGraph import CSRGraph
 
 """
-This is a class for storing a weighted graph, with E edges and V vertices. To do this, we store the nodes
-in a dictionary where the keys are the node names and the values are an adjacency list. Each element in the adjacency
-list stores tuples, where the first element is the adjoining vertex and the second element is the cost of the edge.
-We also store a third argument indicating whether or not the graph is directed. If it is, then we will assume that the
-pairs in edges are of the form [source, sink, cost].
+Dijkstra's algorithm on a CSRGraph, working with vertex numbers rather than names. The frontier is kept in a heap of
+(distance, vertex) pairs; a vertex can be pushed more than once, and the stale entries are skipped when they come off the
+heap, so every edge is looked at once and the whole search is O((V+E) log V). The costs must not be negative.
+
+sources is a list of vertices that all start at distance 0. If target is given, we stop as soon as it is settled, and
+if maxDistance is given, nothing further away than that is settled. Returns two dictionaries, holding the distance and
+the predecessor (None for the sources) of every vertex that was settled, so the number of vertices the search had to
+settle is just the length of either one.
+"""
+def dijkstraSearch(csr,sources,target = None,maxDistance = None):
+    distances = {}
+    predecessors = {}
+    best = {}
+    heap = []
+    for v in sources:
+        best[v] = 0
+        heap.append((0,v,None))
+    heapq.heapify(heap)
+    while len(heap) > 0:
+        d,v,p = heapq.heappop(heap)
+        if v in distances:
+            continue
+        distances[v] = d
+        predecessors[v] = p
+        if v == target:
+            break
+        targets,weights = csr.neighbors(v)
+        for u,w in zip(targets.tolist(),weights.tolist()):
+            du = d + w
+            if u not in distances and (u not in best or du < best[u]) and (maxDistance is None or du <= maxDistance):
+                best[u] = du
+                heapq.heappush(heap,(du,u,v))
+    return distances,predecessors
+
+#follows the predecessors back from target, and returns the path from its source as a list (empty if it was not reached).
+def reconstructPath(predecessors,target):
+    if target not in predecessors:
+        return []
+    path = [target]
+    while predecessors[path[-1]] is not None:
+        path.append(predecessors[path[-1]])
+    return path[::-1]
+
+
+"""
+This is a class for storing a weighted graph, with E edges and V vertices. To do this, we store the graph in compressed
+sparse row form (see CSRGraph), where the nodes are numbered and the edges out of each node are stored next to each other
+along with their costs. The adjacency list of a node is a list of tuples, where the first element is the adjoining vertex
+and the second element is the cost of the edge. We also store a third argument indicating whether or not the graph is
+directed. If it is, then we will assume that the pairs in edges are of the form [source, sink, cost].
 """
 class Graph:
     #nodes is a list of names, and edges is a list of tuples with the following form: [node1, node2, value for edge]
     def __init__(self,nodes,edges,directed = True):
-        if directed:
-            self._adj = {y: [(x[1],x[2]) for x in set(edges) if y == x[0]] for y in set(nodes)}
-        else:
-            self._adj = {y: [(x[0],x[2]) if x[1] == y else (x[1],x[2]) for x in set(edges) if y in (x[0],x[1])] for y in set(nodes)}
+        self._csr = CSRGraph(nodes,edges,directed)
+        self.version = 0
+
+    #a graph that works straight on csr, a CSRGraph that has already been built (or mapped from a file with
+    #GraphFile.readGraph), without copying it.
+    @classmethod
+    def fromCSR(cls,csr):
+        g = cls.__new__(cls)
+        g._csr = csr
+        g.version = 0
+        return g
+
+    #adds an edge (in both directions if the graph is undirected), adding its nodes if they are new. Every change to the
+    #graph goes up the version, so that anything computed from an earlier version (see ShortestPathCache) can tell.
+    def addEdge(self,a,b,cost):
+        self._csr = self._csr.modified([(a,b,cost)])
+        self.version += 1
+
+    #removes every edge from a to b (and from b to a if the graph is undirected).
+    def removeEdge(self,a,b):
+        ia,ib = self._csr.ids[a],self._csr.ids[b]
+        sources,targets = self._csr.sources(),self._csr.targets
+        remove = (sources == ia) & (targets == ib)
+        if not self._csr.directed:
+            remove |= (sources == ib) & (targets == ia)
+        self._csr = self._csr.modified(keep = ~remove)
+        self.version += 1
 
     def numVertices(self):
-        return len(self._adj.keys())
+        return self._csr.numVertices()
 
     def printGraph(self):
-        for a in self._adj.keys():
-            for b in  self._adj[a]:
-                print('{0} -> {1} with edge weight = {2}'.format(a,b[0],b[1]))
+        self._csr.printGraph()
 
+    #the distance from v0 to every node, or None if some node cannot be reached from v0.
     def dijkstra(self,v0):
-        visited = {v0:0}
-        while len(visited) < self.numVertices():
-            candidates = [] #list to determine future additions to visited
-            for v in visited.keys(): #check each visited node
-                candidates.extend([(x[0],x[1] + visited[v]) for x in self._adj[v] if x[0] not in visited.keys()])
-            if len(candidates) == 0:
-                return None
-            d_min = candidates[0][1]
-            d = candidates[0][0]
-            if len(candidates) > 1:
-                for c in candidates[1:]:
-                    if c[1] < d_min:
-                        d_min = c[1]
-                        d = c[0]
-            visited[d] = d_min
-        return visited
+        distances,predecessors = self.shortestPaths(v0)
+        return distances if len(distances) == self.numVertices() else None
+
+    #the distance to, and the predecessor of, every node we can reach from sources (a node, or a list of them) within
+    #maxDistance, or only as far as needed to reach target if that is given.
+    def shortestPaths(self,sources,target = None,maxDistance = None):
+        ids = self._csr.ids
+        names = self._csr.names
+        sources = list(sources) if isinstance(sources,(list,set)) else [sources]
+        distances,predecessors = dijkstraSearch(self._csr,[ids[v] for v in sources],
+                                                None if target is None else ids[target],maxDistance)
+        return ({names[v]: d for v,d in distances.items()},
+                {names[v]: None if p is None else names[p] for v,p in predecessors.items()})
+
+    #the length of the shortest path from v0 to target, along with the path itself as a list of nodes. If target cannot
+    #be reached, the length is infinite and the path is empty.
+    def shortestPath(self,v0,target,maxDistance = None):
+        distances,predecessors = self.shortestPaths(v0,target,maxDistance)
+        return distances.get(target,float("inf")),reconstructPath(predecessors,target)
@@ -0,0 +1,167 @@
+import json
+import platform
+import time
+import tracemalloc
+import numpy as np
+from Algorithms import RandomGraphs as rg
+from Algorithms.CSRGraph import CSRGraph
+from Algorithms.BreadthFirstSearch import bfsSearch, bfsLevels
+from Algorithms.DepthFirstSearch import dfsSearch
+from Algorithms.DijkstrasAlgorithm import dijkstraSearch
+from Algorithms.BellmanFordAlgorithm import relaxVectorized
+
+"""
+A benchmark suite for the graph algorithms. For every number of edges in sizes and every density profile, it generates
+a seeded random graph, builds the CSR graph, and then times each of the algorithms from vertex 0:
+    -bfs: the vertex by vertex breadth first search (bfsSearch)
+    -bfsLevels: the level synchronous breadth first search
+    -dfs: the iterative depth first search over the whole graph
+    -dijkstra: the heap based Dijkstra
+    -bellmanFord: the vectorized Bellman-Ford
+For each one it records the time taken, the edges handled per second and the peak memory allocated while it ran (from
+tracemalloc, which slows things down a little, but in the same way every time). The algorithms that go through the
+vertices one by one in Python are only run up to maxPythonEdges, and Bellman-Ford (which can need as many passes as the
+graph is deep) up to maxBellmanFordEdges; above that they are recorded as skipped.
+
+Up to checkEdges, every result is also checked against a reference: the two breadth first searches have to agree with
+a plain one over a dictionary of lists, Dijkstra and Bellman-Ford (which work in completely different ways) have to
+agree with each other, and the depth first search has to give consistent times and parents.
+
+The results are written as JSON, and can be compared against a baseline file from an earlier run in the same way as the
+benchmark for the inflection analysis: ratio is the time taken divided by the baseline time, and slower flags the cases
+that got more than tolerance times slower. Timings are only comparable on the same machine.
+"""
+
+"""
+The density profiles. Each one is a function that takes the number of edges and a seed, and returns the number of
+vertices and the edges (as undirected pairs):
+    -sparse: G(n, m) with an average degree of 4, like a road network.
+    -dense: G(n, m) with an average degree of 64.
+    -powerLaw: a Chung-Lu graph with exponent 2.5 and an average degree of 8, like a social or web graph.
+    -grid: a square grid, the most spread out of the four.
+"""
+def sparseProfile(m,seed):
+    n = max(m//2,2)
+    return (n,) + rg.randomEdges(n,m,False,seed)
+
+def denseProfile(m,seed):
+    n = max(m//32,9)
+    return (n,) + rg.randomEdges(n,min(m,rg.numPairs(n,False)),False,seed)
+
+def powerLawProfile(m,seed):
+    n = max(m//4,2)
+    return (n,) + rg.powerLaw(n,2.5,8,False,seed)
+
+def gridProfile(m,seed):
+    side = max(int(np.sqrt(m/2)),2)
+    sources,targets,coordinates = rg.gridGraph(side,side)
+    return side*side,sources,targets
+
+profiles = {"sparse": sparseProfile,"dense": denseProfile,"powerLaw": powerLawProfile,"grid": gridProfile}
+
+#the hop counts from v0 by the textbook breadth first search over a dictionary of lists, as the reference.
+def referenceHops(n,sources,targets,v0):
+    adjacency = {}
+    for a,b in zip(sources.tolist(),targets.tolist()):
+        adjacency.setdefault(a,[]).append(b)
+        adjacency.setdefault(b,[]).append(a)
+    hops = [-1]*n
+    hops[v0] = 0
+    level = [v0]
+    while len(level) > 0:
+        nextLevel = []
+        for v in level:
+            for u in adjacency.get(v,[]):
+                if hops[u] == -1:
+                    hops[u] = hops[v] + 1
+                    nextLevel.append(u)
+        level = nextLevel
+    return hops
+
+#checks that the discovery and finish times and the parents from a depth first search fit together.
+def checkDepthFirst(csr,discovery,finish,parents):
+    discovery,finish,parents = np.array(discovery),np.array(finish),np.array(parents)
+    if sorted(np.concatenate([discovery,finish]).tolist()) != list(range(2*csr.numVertices())):
+        return False
+    children = np.flatnonzero(parents >= 0)
+    return bool((discovery[parents[children]] < discovery[children]).all() and
+                (finish[children] < finish[parents[children]]).all() and (discovery < finish).all())
+
+#runs one algorithm and records how it went.
+def measure(record,step,function):
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - started
+    record.append({"step": step,"seconds": seconds,"peakMB": tracemalloc.get_traced_memory()[1]/2**20})
+    return result
+
+def benchmarkGraphs(sizes = [1000,10000,100000,1000000],densities = ["sparse","dense","powerLaw","grid"],
+                    maxPythonEdges = 1000000,maxBellmanFordEdges = 1000000,checkEdges = 100000,outputFile = None,
+                    baselineFile = None,tolerance = 1.25,seed = 0,verbose = True):
+    results = []
+    for m in sizes:
+        for density in densities:
+            n,sources,targets = profiles[density](m,seed)
+            weights = np.random.default_rng(seed).integers(1,100,size = len(sources))
+            steps = []
+            tracemalloc.start()
+            csr = measure(steps,"construction",lambda: CSRGraph.fromArrays(n,sources,targets,weights,False))
+            python = len(sources) <= maxPythonEdges
+            bfs = measure(steps,"bfs",lambda: bfsSearch(csr,0)) if python else None
+            levels = measure(steps,"bfsLevels",lambda: bfsLevels(csr,0))
+            dfs = measure(steps,"dfs",lambda: dfsSearch(csr)) if python else None
+            dijkstra = measure(steps,"dijkstra",lambda: dijkstraSearch(csr,[0])) if python else None
+            bellmanFord = None
+            if len(sources) <= maxBellmanFordEdges:
+                arcs = csr.sources()
+                bellmanFord = measure(steps,"bellmanFord",
+                                      lambda: relaxVectorized(n,arcs,csr.targets,csr.weights,0))
+            tracemalloc.stop()
+            for name in ("bfs","dfs","dijkstra","bellmanFord"):
+                if name not in [s["step"] for s in steps]:
+                    steps.append({"step": name,"seconds": None,"peakMB": None,"check": "skipped"})
+
+            #the checks against the references.
+            checks = {}
+            if len(sources) <= checkEdges:
+                hops = referenceHops(n,sources,targets,0)
+                checks["bfsLevels"] = levels[0].tolist() == hops
+                if bfs is not None:
+                    checks["bfs"] = bfs[1] == hops
+                if dfs is not None:
+                    checks["dfs"] = checkDepthFirst(csr,dfs[1],dfs[2],dfs[3])
+                if dijkstra is not None and bellmanFord is not None:
+                    fromDijkstra = np.full(n,np.inf)
+                    fromDijkstra[list(dijkstra[0].keys())] = list(dijkstra[0].values())
+                    agree = bool((fromDijkstra == np.array(bellmanFord[0])).all())
+                    checks["dijkstra"] = checks["bellmanFord"] = agree
+            for s in steps:
+                if "check" not in s:
+                    s["check"] = "not checked" if s["step"] not in checks else ("passed" if checks[s["step"]] else "FAILED")
+                s.update({"edges": m,"density": density,"vertices": n,"storedEdges": csr.numEdges(),
+                          "edgesPerSecond": csr.numEdges()/s["seconds"] if s["seconds"] else None})
+                results.append(s)
+                if verbose:
+                    print("{0:>10} {1:<10} {2:<14}{3:>10} {4:>10} {5}".format(
+                        m,density,s["step"],"-" if s["seconds"] is None else "{0:.3f}s".format(s["seconds"]),
+                        "-" if s["peakMB"] is None else "{0:.1f}MB".format(s["peakMB"]),s["check"]))
+
+    #compare against the baseline, keyed by size, density and step.
+    if baselineFile is not None:
+        with open(baselineFile) as f:
+            baseline = {(b["edges"],b["density"],b["step"]): b["seconds"] for b in json.load(f)["results"]}
+        for r in results:
+            before = baseline.get((r["edges"],r["density"],r["step"]))
+            r["ratio"] = r["seconds"]/before if r["seconds"] is not None and before else None
+            r["slower"] = r["ratio"] is not None and r["ratio"] > tolerance
+    if outputFile is not None:
+        with open(outputFile,"w") as f:
+            json.dump({"seed": seed,"python": platform.python_version(),"numpy": np.__version__,
+                       "machine": platform.machine(),"results": results},f,indent = 2)
+    return results
+
+if __name__ == '__main__':
+    import sys
+    sizes = [1000,10000,100000,1000000,10000000] if "--full" in sys.argv else [1000,10000,100000]
+    benchmarkGraphs(sizes = sizes,outputFile = "graphBenchmarks.json")
@@ -0,0 +1,131 @@
+import struct
+import numpy as np
+from Algorithms.CSRGraph import CSRGraph
+
+"""
+A binary file format for CSR graphs, so that a big graph can be built once and then loaded instantly, instead of going
+through a list of edge tuples on every run. The file starts with a 64 byte header:
+    -the magic bytes CSRGRAPH and the version of the format
+    -whether the graph is directed, and how the node names are stored (0 for none, 1 for integers, 2 for strings)
+    -the number of vertices V and the number of stored edges E
+    -the numpy dtypes of the targets and the weights
+which is followed by the offsets (V+1 int64), the targets (E), the weights (E) and then the names. Integer names are
+stored as V int64, and string names as V+1 int64 offsets into a block of UTF-8 text. Every section starts on a multiple
+of 8 bytes. Targets are stored as int32 when there are few enough vertices, which halves the largest section.
+
+readGraph maps the sections with np.memmap rather than reading them, so opening even a huge graph is instant, the
+operating system only pages in the parts that are used, and several processes reading the same file share the memory.
+The names are only read when they are first used.
+"""
+
+magic = b"CSRGRAPH"
+version = 1
+headerFormat = "<8sIBB2xqq8s8s"
+headerSize = 64
+
+#rounds up to a multiple of 8.
+def aligned(size):
+    return (size + 7)//8*8
+
+#the layout of the file: where each section starts, given the header values.
+def sections(numVertices,numEdges,targetType,weightType):
+    offsetsAt = headerSize
+    targetsAt = aligned(offsetsAt + 8*(numVertices + 1))
+    weightsAt = aligned(targetsAt + numEdges*np.dtype(targetType).itemsize)
+    namesAt = aligned(weightsAt + numEdges*np.dtype(weightType).itemsize)
+    return offsetsAt,targetsAt,weightsAt,namesAt
+
+#writes an array to the file starting at position, padding the file up to there first.
+def writeAt(f,position,array):
+    f.write(b"\0"*(position - f.tell()))
+    np.ascontiguousarray(array).tofile(f)
+
+"""
+Writes the CSRGraph g to fileName. If writeNames is False (or the names are just the numbers of the vertices), no names
+are stored. Names must be all integers or all strings.
+"""
+def writeGraph(fileName,g,writeNames = True):
+    numVertices,numEdges = g.numVertices(),g.numEdges()
+    targetType = np.dtype("<i4") if numVertices < 2**31 else np.dtype("<i8")
+    weightType = np.asarray(g.weights).dtype.newbyteorder("<")
+    namesKind = 0
+    if writeNames and g._names is not None:
+        names = g.names
+        if all(isinstance(name,(int,np.integer)) for name in names):
+            namesKind = 0 if names == list(range(numVertices)) else 1
+        elif all(isinstance(name,str) for name in names):
+            namesKind = 2
+        else:
+            raise ValueError("Only integer or string names can be written.")
+    offsetsAt,targetsAt,weightsAt,namesAt = sections(numVertices,numEdges,targetType,weightType)
+    with open(fileName,"wb") as f:
+        header = struct.pack(headerFormat,magic,version,int(g.directed),namesKind,numVertices,numEdges,
+                             targetType.str.encode(),weightType.str.encode())
+        f.write(header + b"\0"*(headerSize - len(header)))
+        writeAt(f,offsetsAt,np.asarray(g.offsets,dtype = "<i8"))
+        writeAt(f,targetsAt,np.asarray(g.targets,dtype = targetType))
+        writeAt(f,weightsAt,np.asarray(g.weights,dtype = weightType))
+        if namesKind == 1:
+            writeAt(f,namesAt,np.array(names,dtype = "<i8"))
+        elif namesKind == 2:
+            encoded = [name.encode("utf-8") for name in names]
+            nameOffsets = np.zeros(numVertices + 1,dtype = "<i8")
+            np.cumsum([len(x) for x in encoded],out = nameOffsets[1:])
+            writeAt(f,namesAt,nameOffsets)
+            f.write(b"".join(encoded))
+
+#reads the header of a graph file, and returns the values in it.
+def readHeader(fileName):
+    with open(fileName,"rb") as f:
+        header = f.read(headerSize)
+    fileMagic,fileVersion,directed,namesKind,numVertices,numEdges,targetType,weightType = \
+        struct.unpack(headerFormat,header[:struct.calcsize(headerFormat)])
+    if fileMagic != magic or fileVersion != version:
+        raise ValueError("{0} is not a graph file this version can read.".format(fileName))
+    return bool(directed),namesKind,numVertices,numEdges,targetType.rstrip(b"\0").decode(),weightType.rstrip(b"\0").decode()
+
+"""
+Opens a graph written by writeGraph as a CSRGraph whose arrays are mapped straight from the file (read only), so it can
+be handed to any of the graph algorithms, or to the Graph classes with Graph.fromCSR, without copying anything.
+"""
+def readGraph(fileName):
+    directed,namesKind,numVertices,numEdges,targetType,weightType = readHeader(fileName)
+    offsetsAt,targetsAt,weightsAt,namesAt = sections(numVertices,numEdges,targetType,weightType)
+
+    #plain ndarray views of the maps, since slicing a memmap is a good deal slower.
+    def mapped(dtype,position,count):
+        if count == 0:
+            return np.zeros(0,dtype = dtype)
+        return np.memmap(fileName,dtype = dtype,mode = "r",offset = position,shape = (count,)).view(np.ndarray)
+
+    offsets = mapped("<i8",offsetsAt,numVertices + 1)
+    targets = mapped(targetType,targetsAt,numEdges)
+    weights = mapped(weightType,weightsAt,numEdges)
+
+    def names():
+        if namesKind == 1:
+            return mapped("<i8",namesAt,numVertices).tolist()
+        nameOffsets = mapped("<i8",namesAt,numVertices + 1).tolist()
+        text = bytes(mapped(np.uint8,namesAt + 8*(numVertices + 1),nameOffsets[-1]))
+        return [text[a:b].decode("utf-8") for a,b in zip(nameOffsets[:-1],nameOffsets[1:])]
+
+    return CSRGraph.fromCSR(offsets,targets,weights,directed,None if namesKind == 0 else names)
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    import time
+    from Algorithms import RandomGraphs as rg
+    from Algorithms.DijkstrasAlgorithm import Graph
+    n = 200000
+    g = rg.toGraph(n,*rg.erdosRenyi(n,5/n,seed = 0),low = 1,high = 20,seed = 0)
+    fileName = os.path.join(tempfile.gettempdir(),"graph.csr")
+    started = time.time()
+    writeGraph(fileName,g)
+    print("Wrote {0} edges in {1:.2f}s ({2} bytes)".format(g.numEdges(),time.time() - started,os.path.getsize(fileName)))
+    started = time.time()
+    mappedGraph = readGraph(fileName)
+    print("Mapped the graph in {0:.4f}s".format(time.time() - started))
+    started = time.time()
+    print("Distance from 0 to 1: {0} (found in {1:.2f}s)".format(Graph.fromCSR(mappedGraph).shortestPath(0,1)[0],
+                                                                   time.time() - started))
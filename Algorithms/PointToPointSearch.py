@@ -0,0 +1,146 @@
+import heapq
+import numpy as np
+from Algorithms.DijkstrasAlgorithm import dijkstraSearch, reconstructPath
+
+"""
+Shortest path searches between a single source and a single target on a CSRGraph, with vertices given by number. Plain
+Dijkstra (dijkstraSearch with a target) settles every vertex that is closer to the source than the target is, which on a
+big graph is most of it. The two searches here get the same answer while settling far fewer vertices:
+    -aStarSearch orders the frontier by distance so far plus a lower bound on the distance left (the heuristic), so the
+     search heads towards the target.
+    -bidirectionalDijkstra searches forwards from the source and backwards from the target at the same time, and stops
+     once the two searches can no longer find a shorter path between them.
+Both return the distance (inf if there is no path), the path as a list of vertex numbers, and the number of vertices
+that were settled. The costs must not be negative.
+"""
+
+"""
+A* search from source to target. heuristic is a function that takes a vertex number and gives a lower bound on the cost
+of getting from there to the target (the search is only guaranteed to find a shortest path if it never overestimates).
+A vertex is settled again if a shorter path to it turns up later, which can only happen with a heuristic that is
+admissible but not consistent.
+"""
+def aStarSearch(csr,source,target,heuristic):
+    best = {source: 0}
+    predecessors = {source: None}
+    heap = [(heuristic(source),0,source)]
+    settled = 0
+    while len(heap) > 0:
+        f,d,v = heapq.heappop(heap)
+        if d > best[v]:
+            continue
+        settled += 1
+        if v == target:
+            return d,reconstructPath(predecessors,target),settled
+        targets,weights = csr.neighbors(v)
+        for u,w in zip(targets.tolist(),weights.tolist()):
+            du = d + w
+            if u not in best or du < best[u]:
+                best[u] = du
+                predecessors[u] = v
+                heapq.heappush(heap,(du + heuristic(u),du,u))
+    return float("inf"),[],settled
+
+"""
+Heuristics for aStarSearch on graphs whose vertices have positions, like the grids from RandomGraphs.gridGraph.
+coordinates is a V x k array of positions, and scale is the smallest cost per unit of distance of any edge, so that the
+bound is never too big. The bounds for every vertex are worked out at once, and the function returned just looks them up.
+Euclidean distance suits graphs with edges in any direction, and Manhattan distance suits grids without diagonals (where
+it is a much tighter bound).
+"""
+def euclideanHeuristic(coordinates,target,scale = 1):
+    coordinates = np.asarray(coordinates,dtype = np.float64)
+    return (scale*np.sqrt(np.square(coordinates - coordinates[target]).sum(axis = 1))).tolist().__getitem__
+
+def manhattanHeuristic(coordinates,target,scale = 1):
+    coordinates = np.asarray(coordinates,dtype = np.float64)
+    return (scale*np.abs(coordinates - coordinates[target]).sum(axis = 1)).tolist().__getitem__
+
+"""
+Bidirectional Dijkstra from source to target, searching forwards along the edges of csr and backwards along the edges of
+reverse (its reverse graph, made with csr.reverse() if it is not given). Each step settles the vertex with the smallest
+distance on either side. Whenever an edge reaches a vertex the other side has seen, the path through it is a candidate,
+and we keep the shortest one. We can stop once the smallest distances left on the two sides add up to at least that:
+any shorter path would have to go through a vertex that is closer than that to one end, and so would already have been
+seen from both sides.
+"""
+def bidirectionalDijkstra(csr,source,target,reverse = None):
+    if source == target:
+        return 0,[source],1
+    reverse = csr.reverse() if reverse is None else reverse
+    graphs = (csr,reverse)
+    best = ({source: 0},{target: 0})
+    predecessors = ({source: None},{target: None})
+    done = (set(),set())
+    heaps = ([(0,source)],[(0,target)])
+    shortest = float("inf")
+    meet = None
+    while len(heaps[0]) > 0 and len(heaps[1]) > 0:
+        if heaps[0][0][0] + heaps[1][0][0] >= shortest:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        d,v = heapq.heappop(heaps[side])
+        if v in done[side]:
+            continue
+        done[side].add(v)
+        mine,other = best[side],best[1 - side]
+        targets,weights = graphs[side].neighbors(v)
+        for u,w in zip(targets.tolist(),weights.tolist()):
+            du = d + w
+            if u not in mine or du < mine[u]:
+                mine[u] = du
+                predecessors[side][u] = v
+                heapq.heappush(heaps[side],(du,u))
+            if u in other and mine[u] + other[u] < shortest:
+                shortest = mine[u] + other[u]
+                meet = u
+    if meet is None:
+        return float("inf"),[],len(done[0]) + len(done[1])
+    path = reconstructPath(predecessors[0],meet)
+    v = predecessors[1][meet]
+    while v is not None:
+        path.append(v)
+        v = predecessors[1][v]
+    return shortest,path,len(done[0]) + len(done[1])
+
+if __name__ == '__main__':
+    import time
+    from Algorithms import RandomGraphs as rg
+    from Algorithms.CSRGraph import CSRGraph
+
+    #compares the number of vertices settled by each search (and the time taken) over random queries, and checks that
+    #they all find the same distances.
+    def benchmark(label,csr,pairs,heuristicFor = None):
+        reverse = csr.reverse()
+        searches = [("Dijkstra",lambda s,t: dijkstraSearch(csr,[s],t)),
+                    ("Bidirectional Dijkstra",lambda s,t: bidirectionalDijkstra(csr,s,t,reverse))]
+        if heuristicFor is not None:
+            searches.append(("A*",lambda s,t: aStarSearch(csr,s,t,heuristicFor(t))))
+        print(label)
+        answers = []
+        for name,search in searches:
+            settled = 0
+            distances = []
+            started = time.time()
+            for s,t in pairs:
+                result = search(s,t)
+                if name == "Dijkstra":
+                    distances.append(result[0].get(t,float("inf")))
+                    settled += len(result[0])
+                else:
+                    distances.append(result[0])
+                    settled += result[2]
+            answers.append(distances)
+            print("    {0:<24}{1:>12.0f} settled per query {2:>8.3f}s per query".format(name,settled/len(pairs),
+                                                                                        (time.time() - started)/len(pairs)))
+        print("    Same distances: {0}".format(all(a == answers[0] for a in answers)))
+
+    rng = np.random.default_rng(0)
+    side = 300
+    sources,targets,coordinates = rg.gridGraph(side,side)
+    grid = CSRGraph.fromArrays(side*side,sources,targets,rng.integers(1,10,size = len(sources)),False)
+    pairs = rng.integers(0,side*side,size = (20,2)).tolist()
+    benchmark("{0} x {0} grid, costs 1 to 9".format(side),grid,pairs,lambda t: manhattanHeuristic(coordinates,t))
+    n = 200000
+    sparse = rg.toGraph(n,*rg.erdosRenyi(n,3/n,seed = 0),low = 1,high = 20,seed = 0)
+    benchmark("Random graph, {0} vertices, average degree 3".format(n),sparse,rng.integers(0,n,size = (20,2)).tolist())
@@ -0,0 +1,160 @@
+import numpy as np
+from Algorithms.CSRGraph import CSRGraph
+
+"""
+Generators for big random graphs, to feed the graph algorithms. Rather than looking at every pair of vertices, each one
+draws the edges it needs straight into numpy arrays, so graphs with millions of vertices take seconds. Every generator
+takes a seed (anything np.random.default_rng accepts, including a Generator to carry on from) so that the same graph
+can be made again, and returns two arrays with the source and the sink of every edge, with vertices numbered 0 to n-1.
+toGraph turns these into a CSRGraph with random costs.
+"""
+
+#the number of pairs of vertices there are to choose from: (i, j) with i < j for undirected graphs, and i != j for
+#directed ones.
+def numPairs(n,directed):
+    return n*(n - 1) if directed else n*(n - 1)//2
+
+#turns pair numbers (from 0 to numPairs - 1) back into pairs of vertices. Undirected pairs are numbered along the rows of
+#the lower triangle of the adjacency matrix, so pair k is (j, i) with k = i(i-1)/2 + j and j < i. The square root can
+#be out by one for big k, so we correct for that.
+def decodePairs(k,n,directed):
+    k = np.asarray(k,dtype = np.int64)
+    if directed:
+        sources = k//(n - 1)
+        targets = k % (n - 1)
+        return sources,targets + (targets >= sources)
+    i = ((1 + np.sqrt(1 + 8*k.astype(np.float64)))//2).astype(np.int64)
+    i -= i*(i - 1)//2 > k
+    i += (i + 1)*i//2 <= k
+    return k - i*(i - 1)//2,i
+
+#the distinct values in an array of integers, in order. This sorts and compares neighbours, which is a lot quicker than
+#np.unique for the tens of millions of pair numbers we deal with here.
+def distinct(values):
+    values = np.sort(values)
+    return values[np.concatenate([[True],values[1:] != values[:-1]])] if len(values) > 0 else values
+
+"""
+Erdos-Renyi G(n, p) graph, where every pair of vertices has an edge with probability p. Instead of flipping a coin for
+every pair, we draw the gaps between the pairs that get an edge, which are geometric with parameter p, so the time taken
+only depends on the number of edges. The gaps are drawn in batches of around the number of edges we expect.
+"""
+def erdosRenyi(n,p,directed = False,seed = None):
+    rng = np.random.default_rng(seed)
+    total = numPairs(n,directed)
+    if p <= 0 or total == 0:
+        return np.zeros(0,dtype = np.int64),np.zeros(0,dtype = np.int64)
+    if p >= 1:
+        return decodePairs(np.arange(total),n,directed)
+    batch = int(min(total*p + 10*np.sqrt(total*p) + 100,10000000))
+    chunks = []
+    position = -1
+    while position < total:
+        positions = position + np.cumsum(rng.geometric(p,size = batch))
+        position = positions[-1]
+        chunks.append(positions[positions < total])
+    return decodePairs(np.concatenate(chunks),n,directed)
+
+"""
+Erdos-Renyi G(n, m) graph, with exactly m edges chosen at random from all pairs of vertices. We draw a few more pair
+numbers than we need, drop the repeats, and keep m of what is left (in a random order).
+"""
+def randomEdges(n,m,directed = False,seed = None):
+    rng = np.random.default_rng(seed)
+    total = numPairs(n,directed)
+    if m > total:
+        raise ValueError("There are only {0} pairs of vertices to choose from.".format(total))
+    if m > total//2:
+        chosen = rng.permutation(total)[:m]
+    else:
+        chosen = np.zeros(0,dtype = np.int64)
+        while len(chosen) < m:
+            extra = m - len(chosen)
+            chosen = distinct(np.concatenate([chosen,rng.integers(0,total,size = extra + extra//10 + 10)]))
+        chosen = rng.permutation(chosen)[:m]
+    return decodePairs(chosen,n,directed)
+
+"""
+Chung-Lu graph with a power law degree distribution. Vertex i gets a weight proportional to (i + 1)^(-1/(exponent - 1)),
+and both ends of every edge are drawn in proportion to these weights, so the expected degrees follow a power law with the
+given exponent and average. Self loops and repeated edges are dropped, so there can be a few less edges than expected.
+Looking up the ends is much quicker with the random numbers in order, so we sort them and shuffle the sinks afterwards.
+"""
+def powerLaw(n,exponent = 2.5,averageDegree = 10,directed = False,seed = None):
+    rng = np.random.default_rng(seed)
+    weights = np.arange(1,n + 1,dtype = np.float64)**(-1/(exponent - 1))
+    cumulative = np.cumsum(weights)
+    m = int(n*averageDegree/(1 if directed else 2))
+    sources = np.searchsorted(cumulative,np.sort(rng.random(m))*cumulative[-1],side = "right")
+    targets = rng.permutation(np.searchsorted(cumulative,np.sort(rng.random(m))*cumulative[-1],side = "right"))
+    keep = sources != targets
+    sources,targets = sources[keep],targets[keep]
+    if not directed:
+        sources,targets = np.minimum(sources,targets),np.maximum(sources,targets)
+    pairs = distinct(sources*n + targets)
+    return pairs//n,pairs % n
+
+"""
+Preferential attachment (Barabasi-Albert) graph, made with the method of Batagelj and Brandes. Vertices arrive one at a
+time and each adds m edges, whose other ends are picked in proportion to degree. This is the same as picking a random
+entry of the list of the ends of all edges so far: entry 2k+1 (the other end of edge k) copies a random entry r <= 2k.
+If r is even, it holds the vertex that added edge r/2, and otherwise it copies another entry, so instead of filling the
+list in order we follow these copies back for all of the entries at once by pointer jumping. Self loops and repeated
+edges can occur, as in the original method.
+"""
+def preferentialAttachment(n,m = 2,seed = None):
+    rng = np.random.default_rng(seed)
+    k = np.arange(n*m,dtype = np.int64)
+    r = (rng.random(n*m)*(2*k + 1)).astype(np.int64)
+    pointers = np.where(r % 2 == 0,-1,(r - 1)//2)
+    values = np.where(r % 2 == 0,r//2//m,0)
+    unresolved = np.flatnonzero(pointers >= 0)
+    while len(unresolved) > 0:
+        #every entry jumps from the pointers as they were at the start of the round, so that an entry whose target
+        #is resolved in this same round jumps to where the target pointed, rather than picking up its -1.
+        targets = pointers[unresolved]
+        following = pointers[targets]
+        done = following < 0
+        values[unresolved[done]] = values[targets[done]]
+        pointers[unresolved] = np.where(done,-1,following)
+        unresolved = unresolved[~done]
+    return k//m,values
+
+"""
+A rows x cols grid graph, where every vertex is joined to the ones to its right and below it (and diagonally if diagonal
+is True). Vertex number i is at row i // cols and column i % cols. Along with the edges, returns the (row, column) of
+every vertex as an n x 2 array, which is handy for heuristics based on distance.
+"""
+def gridGraph(rows,cols,diagonal = False):
+    ids = np.arange(rows*cols,dtype = np.int64).reshape(rows,cols)
+    pairs = [(ids[:,:-1],ids[:,1:]),(ids[:-1,:],ids[1:,:])]
+    if diagonal:
+        pairs.extend([(ids[:-1,:-1],ids[1:,1:]),(ids[:-1,1:],ids[1:,:-1])])
+    sources = np.concatenate([a.ravel() for a,b in pairs])
+    targets = np.concatenate([b.ravel() for a,b in pairs])
+    coordinates = np.stack([ids.ravel()//cols,ids.ravel() % cols],axis = 1)
+    return sources,targets,coordinates
+
+#turns the edges from one of the generators into a CSRGraph, with integer costs drawn from low to high (inclusive).
+def toGraph(n,sources,targets,low = 1,high = 1,directed = False,seed = None):
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(low,high + 1,size = len(sources))
+    return CSRGraph.fromArrays(n,sources,targets,weights,directed)
+
+if __name__ == '__main__':
+    #checks preferentialAttachment against the method of Batagelj and Brandes done in order, one entry at a time, with
+    #the same random draws.
+    def sequentialAttachment(n,m,seed):
+        rng = np.random.default_rng(seed)
+        r = (rng.random(n*m)*(2*np.arange(n*m) + 1)).astype(np.int64).tolist()
+        ends = []
+        for k in range(n*m):
+            ends.append(k//m)
+            ends.append(ends[r[k]])
+        return ends[1::2]
+
+    for n,m,seed in [(2000,2,0),(2000,2,1),(5000,1,2),(1000,5,3)]:
+        sources,targets = preferentialAttachment(n,m,seed)
+        same = targets.tolist() == sequentialAttachment(n,m,seed)
+        print("n = {0}, m = {1}: same as in order: {2}, edges to later vertices: {3}".format(
+            n,m,same,int((targets > sources).sum())))
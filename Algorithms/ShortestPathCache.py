@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from Algorithms.BellmanFordAlgorithm import BellmanFordPaths
+
+"""
+A cache for shortest path queries, for when the same distances are asked for over and over between changes to the graph.
+It works like the LRU cache in LRUCache.py: it holds at most capacity results, and once it is full, adding one more
+evicts the one that was used least recently. Here the bookkeeping is done by an OrderedDict, which keeps the entries in
+the order they were last used and can move an entry to the end or drop the first one in constant time.
+
+Results are stored under (source, target, version), where version is the version of the graph when the result was
+computed. The graph classes go up a version whenever an edge is added or removed, so a result for an old version can
+never be returned. The first query after a change also clears out everything from earlier versions, since none of it can
+be used again. The counters (see stats) show how often the cache is paying off.
+
+query is the function that does the work for a miss. It takes the graph, a source and a target, and returns a pair of
+the distance and the path. dijkstraQuery suits the Graph from DijkstrasAlgorithm.py, and bellmanFordQuery suits the one
+from BellmanFordAlgorithm.py.
+"""
+
+#the length and the path of the shortest path, for the Graph from DijkstrasAlgorithm.py.
+def dijkstraQuery(graph,source,target):
+    return graph.shortestPath(source,target)
+
+#the length and the path of the shortest path, for the Graph from BellmanFordAlgorithm.py. If there is a negative cycle
+#that can be reached from source, the length is -inf and the path is the cycle.
+def bellmanFordQuery(graph,source,target):
+    distances,predecessors,cycle = BellmanFordPaths(graph,source)
+    if cycle is not None:
+        return float("-inf"),cycle
+    index = {v: i for i,v in enumerate(graph.nodes)}
+    if distances[index[target]] == float("inf"):
+        return float("inf"),[]
+    path = [target]
+    while path[-1] != source:
+        path.append(predecessors[index[path[-1]]])
+    return distances[index[target]],path[::-1]
+
+class ShortestPathCache:
+    def __init__(self,graph,capacity = 1024,query = dijkstraQuery):
+        self.graph = graph
+        self.capacity = capacity
+        self.query = query
+        self.entries = OrderedDict()
+        self.version = graph.version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    #the length and the path of the shortest path from source to target, from the cache if we have it.
+    def shortestPath(self,source,target):
+        if self.graph.version != self.version:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.version = self.graph.version
+        key = (source,target,self.version)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        result = self.query(self.graph,source,target)
+        self.entries[key] = result
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+        return result
+
+    def distance(self,source,target):
+        return self.shortestPath(source,target)[0]
+
+    #the counters, along with the share of queries that were answered from the cache.
+    def stats(self):
+        queries = self.hits + self.misses
+        return {"hits": self.hits,"misses": self.misses,"hitRate": self.hits/queries if queries > 0 else 0.0,
+                "evictions": self.evictions,"invalidations": self.invalidations,"size": len(self.entries)}
+
+if __name__ == '__main__':
+    import random
+    from Algorithms.DijkstrasAlgorithm import Graph
+    random.seed(0)
+    nodes = list(range(200))
+    g = Graph(nodes,[(random.randrange(200),random.randrange(200),random.randint(1,10)) for i in range(1000)])
+    cache = ShortestPathCache(g,capacity = 400)
+    pairs = [(random.randrange(20),random.randrange(20)) for i in range(2000)]
+    for i,(s,t) in enumerate(pairs):
+        if i == 1000:
+            g.addEdge(0,1,1)
+        cache.distance(s,t)
+    print(cache.stats())
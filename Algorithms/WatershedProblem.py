@@ -39,7 +39,29 @@ Once we have the coordinates for the neighbors, we need to convert them to the c
 update the entries in the array so that a node is pointing at its parents. We need a helper function to identify the
 ultimate parents. Once we have all of this, we collect the entries into a dictionary and that gives us the connected
 components.
+
+For big elevation rasters (up to 10000 x 10000 and more, and not necessarily square), going through the cells one at a
+time in Python is far too slow, so watershedLabels does the same thing for the whole grid at once with numpy. Comparing
+the grid with copies of itself shifted one step north, south, west and east gives every cell's lowest lower neighbour
+(ties go to the last of these directions, as in findWatersheds before), and so a pointer from every cell to where its
+water goes. Cells with no lower neighbour point at themselves; these are the bottoms of the watersheds. Following the
+pointers to the bottom is done for every cell together by pointer jumping: every cell replaces its pointer with its
+pointer's pointer, which doubles how far it has got, so even a slope thousands of cells long only takes a dozen or so
+rounds. The label of every cell is then the (1D) position of the bottom of its watershed.
+
+For rasters too big to hold in memory, tiledWatershedLabels reads the grid from a .npy file in tiles, and hands the
+tiles to a pool of worker processes. Each worker reads its tile with a one cell halo around it (so it can see the
+neighbours of the cells on its edge), follows the pointers as far as they go inside the tile, and writes the result
+straight into a memmapped label raster. Water that leaves a tile can only do so from a cell on its edge, so all that
+comes back to the main process is where the edge cells of every tile end up. These are joined up across the tiles with
+a union find, which gives the bottom of the watershed for every edge cell, and a second pass over the tiles swaps the
+cells that drain out of their tile over to that. The labels are exactly those of watershedLabels.
 """
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.format import open_memmap
+from Algorithms.UnionFind import ArrayUnionFind
+
 def findLowestNeighborRowAndColumn(mat,r,c):
     neighbors = []
     myValue = mat[r][c]
@@ -59,7 +81,7 @@ def findLowestNeighborRowAndColumn(mat,r,c):
         if v < myValue:
             neighbors.append(("West",v,[r,c-1]))
             minValue = v if v < minValue else minValue
-    if c < len(mat)-1:
+    if c < len(mat[r])-1:
         v = mat[r][c+1]
         if v < myValue:
             neighbors.append(("East",v,[r,c+1]))
@@ -70,14 +92,10 @@ def convert2Dto1D(r,c,n):
     return n*r + c
 
 def convert1Dto2D(k,n):
-    r = k % n
+    r = k // n
     c = k - (n*r)
     return (r,c)
 
-def initializeLabels(n):
-    res = [x for x in range(n**2)]
-    return res
-
 def findParent(arr,n):
     while True:
         if arr[n] == n:
@@ -85,27 +103,165 @@ def findParent(arr,n):
         else:
             n = arr[n]
 
+"""
+Helper function that finds the lowest lower neighbour of every cell of a 2D array of elevations at once, as described
+above. Returns a flat array with, for every cell, the position (in the flattened array) of the cell its water goes to,
+which is the cell itself for the bottom of a watershed.
+"""
+def lowestNeighbors(mat):
+    rows,cols = mat.shape
+    dtype = np.int32 if rows*cols < 2**31 else np.int64
+    cells = np.arange(rows*cols,dtype = dtype).reshape(rows,cols)
+    pointers = cells.copy()
+    lowest = mat.copy()
+    #each direction is the part of the grid that has a neighbour that way, the matching neighbours, and the step to them.
+    directions = [((slice(1,None),slice(None)),(slice(None,-1),slice(None)),-cols),
+                  ((slice(None,-1),slice(None)),(slice(1,None),slice(None)),cols),
+                  ((slice(None),slice(1,None)),(slice(None),slice(None,-1)),-1),
+                  ((slice(None),slice(None,-1)),(slice(None),slice(1,None)),1)]
+    for here,there,step in directions:
+        neighbors = mat[there]
+        lower = (neighbors < mat[here]) & (neighbors <= lowest[here])
+        lowest[here] = np.where(lower,neighbors,lowest[here])
+        pointers[here] = np.where(lower,cells[here] + step,pointers[here])
+    return pointers.ravel()
+
+#follows a flat array of pointers to the end for every position at once, by pointer jumping.
+def followPointers(pointers):
+    jumped = np.empty_like(pointers)
+    while True:
+        np.take(pointers,pointers,out = jumped)
+        if np.array_equal(jumped,pointers):
+            return pointers
+        pointers,jumped = jumped,pointers
+
+"""
+Labels every cell of a 2D grid of elevations (anything numpy can turn into an array) with the watershed it drains into,
+as described above. Returns an array of labels the same shape as the grid, where each label is the position in the
+flattened grid of the bottom of that watershed, along with the number of watersheds.
+"""
+def watershedLabels(elevations):
+    mat = np.asarray(elevations)
+    pointers = lowestNeighbors(mat)
+    count = int(np.count_nonzero(pointers == np.arange(len(pointers))))
+    return followPointers(pointers).reshape(mat.shape),count
+
+#the rows and columns of the tiles covering a rows x cols grid.
+def tileBounds(rows,cols,tileSize):
+    return [(r0,min(r0 + tileSize,rows),c0,min(c0 + tileSize,cols))
+            for r0 in range(0,rows,tileSize) for c0 in range(0,cols,tileSize)]
+
+#the (1D) positions of the cells on the edge of a tile, in order.
+def tileEdge(cols,r0,r1,c0,c1):
+    inside = np.zeros((r1 - r0,c1 - c0),dtype = bool)
+    inside[1:-1,1:-1] = True
+    r,c = np.nonzero(~inside)
+    return (r + r0).astype(np.int64)*cols + c + c0
+
+#the (1D) positions of the cells just outside a tile that are next to one of its cells, in order.
+def tileRing(rows,cols,r0,r1,c0,c1):
+    parts = []
+    if r0 > 0:
+        parts.append((r0 - 1)*cols + np.arange(c0,c1))
+    if c0 > 0:
+        parts.append(np.arange(r0,r1)*cols + c0 - 1)
+    if c1 < cols:
+        parts.append(np.arange(r0,r1)*cols + c1)
+    if r1 < rows:
+        parts.append(r1*cols + np.arange(c0,c1))
+    return np.sort(np.concatenate(parts + [np.zeros(0,dtype = np.int64)]).astype(np.int64))
+
+"""
+The first pass over a tile. Follows the pointers of its cells until they reach the bottom of a watershed or leave the
+tile, and writes where each cell got to (as a position in the whole grid) into the output file. Returns the edge cells
+of the tile, where they got to, whether that is the bottom of a watershed, and the number of bottoms in the tile.
+"""
+def resolveTile(inputFile,outputFile,r0,r1,c0,c1):
+    grid = np.load(inputFile,mmap_mode = "r")
+    rows,cols = grid.shape
+    w0,w1,v0,v1 = max(r0 - 1,0),min(r1 + 1,rows),max(c0 - 1,0),min(c1 + 1,cols)
+    width = v1 - v0
+    window = lowestNeighbors(np.array(grid[w0:w1,v0:v1])).reshape(w1 - w0,width)
+    pointers = window[r0 - w0:r1 - w0,c0 - v0:c1 - v0].ravel().astype(np.int64)
+    pr,pc = pointers//width + w0,pointers % width + v0
+    leaves = (pr < r0) | (pr >= r1) | (pc < c0) | (pc >= c1)
+    cells = np.arange(len(pointers))
+    local = np.where(leaves,cells,(pr - r0)*(c1 - c0) + pc - c0)
+    count = int(np.count_nonzero(local[~leaves] == cells[~leaves]))
+    ends = followPointers(local)
+    sink = ~leaves[ends]
+    reached = np.where(sink,(ends//(c1 - c0) + r0)*cols + ends % (c1 - c0) + c0,pr[ends]*cols + pc[ends])
+    output = open_memmap(outputFile,mode = "r+")
+    output[r0:r1,c0:c1] = reached.reshape(r1 - r0,c1 - c0)
+    output.flush()
+    edge = tileEdge(cols,r0,r1,c0,c1)
+    onEdge = (edge//cols - r0)*(c1 - c0) + edge % cols - c0
+    return edge,reached[onEdge],sink[onEdge],count
+
+#the second pass over a tile. Every cell that drains out of the tile gets the label of the cell outside it that it drains
+#to, from ring (the cells around the tile, in order) and labels.
+def relabelTile(outputFile,r0,r1,c0,c1,ring,labels):
+    output = open_memmap(outputFile,mode = "r+")
+    rows,cols = output.shape
+    tile = np.array(output[r0:r1,c0:c1])
+    r,c = tile//cols,tile % cols
+    outside = (r < r0) | (r >= r1) | (c < c0) | (c >= c1)
+    if outside.any():
+        tile[outside] = labels[np.searchsorted(ring,tile[outside])]
+        output[r0:r1,c0:c1] = tile
+        output.flush()
+
+#runs function over every set of arguments in tasks, in this process or in a pool of workers.
+def runTiles(function,tasks,workers):
+    if workers is None or workers <= 1:
+        return [function(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        return list(executor.map(function,*zip(*tasks)))
+
+"""
+Labels the 2D grid of elevations stored in the .npy file inputFile in tiles of tileSize x tileSize, as described above,
+and writes the labels into a new .npy file called outputFile. Returns the number of watersheds. With workers set to 1
+(or None) all the tiles are done in this process.
+"""
+def tiledWatershedLabels(inputFile,outputFile,tileSize = 2048,workers = None):
+    rows,cols = np.load(inputFile,mmap_mode = "r").shape
+    dtype = np.int32 if rows*cols < 2**31 else np.int64
+    open_memmap(outputFile,mode = "w+",dtype = dtype,shape = (rows,cols)).flush()
+    tiles = tileBounds(rows,cols,tileSize)
+    results = runTiles(resolveTile,[(inputFile,outputFile) + tile for tile in tiles],workers)
+    edge,reached,sink = (np.concatenate([r[i] for r in results]) for i in range(3))
+    count = sum(r[3] for r in results)
+
+    #join every edge cell to where it got to, so that each group holds exactly one bottom of a watershed.
+    nodes = np.sort(np.concatenate([edge,reached]))
+    nodes = nodes[np.concatenate([[True],nodes[1:] != nodes[:-1]])]
+    edgeNodes,reachedNodes = np.searchsorted(nodes,edge),np.searchsorted(nodes,reached)
+    uf = ArrayUnionFind(len(nodes))
+    uf.BatchUnion(edgeNodes,reachedNodes)
+    roots = uf.Labels()
+    bottoms = np.empty(len(nodes),dtype = np.int64)
+    bottoms[roots[reachedNodes[sink]]] = reached[sink]
+    order = np.argsort(edge)
+    edge,labels = edge[order],bottoms[roots[edgeNodes]][order]
+
+    tasks = []
+    for r0,r1,c0,c1 in tiles:
+        ring = tileRing(rows,cols,r0,r1,c0,c1)
+        tasks.append((outputFile,r0,r1,c0,c1,ring,labels[np.searchsorted(edge,ring)]))
+    runTiles(relabelTile,tasks,workers)
+    return count
+
 def findWatersheds(input):
-    arr = initializeLabels(len(input))
-    for r in range(len(input)):
-        for c in range(len(input[r])):
-            k = convert2Dto1D(r,c,len(input))
-            x = findLowestNeighborRowAndColumn(input,r,c)
-            if x is not None:
-                for parent in x:
-                    j = convert2Dto1D(parent[2][0],parent[2][1],len(input))
-                    arr[k] = j
+    labels,count = watershedLabels(input)
     d = {}
-    for a in range(len(arr)):
-        p = findParent(arr,a)
+    for a,p in enumerate(labels.ravel().tolist()):
         if d.get(p,"NA") == "NA":
             d[p] = [a]
         else:
             d[p].append(a)
-    print("There are {0} different watersheds.".format(len(d.keys())))
+    print("There are {0} different watersheds.".format(count))
     print("The watersheds are distributed as follows: {0}".format(d))
 
-input = [ [0, 1, 2, 2],[1, 2, 4, 2],[1, 2, 0, 3],[1, 2, 0, 5]]
-findWatersheds(input)
-
-
+if __name__ == '__main__':
+    input = [ [0, 1, 2, 2],[1, 2, 4, 2],[1, 2, 0, 3],[1, 2, 0, 5]]
+    findWatersheds(input)
@@ -193,6 +193,20 @@ rawData
 # # Part 3: Code Implementation
 # 
 # Below we have the full implementation of the classes Inflection and InflectionAnalysis. The user will only need to instantiate an instance of the latter, which makes use of the former.
+#
+# For data files that are too big to read in one go, InflectionAnalysis can be given a chunksize. The file is then read that many rows at a time, only the columns we need are kept, and each chunk is immediately summed by merchant, date, panel and type, so memory depends on the number of distinct days per series rather than on the size of the file.
+#
+# Since the data file grows by a few days at a time, the analysis can also be brought up to date without starting over. Calling appendData with the new rows merges them into the grouped data and only recomputes the last few second derivatives of each series that the new days can affect (how many depends on how far the stencil for the approach reaches). The inflections found earlier in each series are kept as they are, and passing verify = True checks the result against a full run.
+#
+# For a large number of merchants, running FirstDerivative once per series means hundreds of small pandas calls. Passing backend = "tensor" to detectInflections instead pivots the sales for the chosen partition into a single dense merchant x panel x type x date array, with NaN on days that have no data, and takes the derivatives and the concavity scan for every series at once. By default the days that are present are packed together, which gives exactly the same inflections as the pandas backend; with missingDays = "calendar" no derivative is taken across a missing day.
+#
+# Daily sales are noisy, and stepping from one day to the next picks up a lot of very short-lived changes in concavity (we will see 23 of them in a single month for Netflix below). detectInflectionsMultiScale runs the detection at several scales at once: for each scale the derivative formula steps over that many days instead of one, and a Savitzky-Golay second derivative (from a low order polynomial fit over a window of days) can be added as well. All of them are computed in one pass over the data and returned together, keyed by a label such as "3point-h7".
+#
+# The verbose option prints a few lines for every series, which is useful for debugging but floods the output (and slows things down) on a big run. To see where the time goes instead, create the analysis with profile = True. Every stage (loading, fixing dates, grouping, the two derivatives, the scan and the statistics) then has its wall time and row count recorded per approach and partition in analysis.profile, which can be turned into a DataFrame or exported as JSON.
+#
+# Even at a larger scale, a change in concavity is not always what we are after: often the question is simply when the level of sales moved. Passing approach = "cusum" or "pelt" to detectInflections finds change points instead. CUSUM adds up how far each day is from the mean since the last change (in units of the day to day noise of the series) and reports a change once that sum passes a threshold; PELT finds the segmentation into constant levels with the lowest cost, paying a penalty for every extra segment. Both run over every series of the partition together (PELT can also be spread over several processes with detectChangePoints), and they return Inflection objects, so they can be compared with the other approaches using the same statistics.
+#
+# Finally, InflectionIndex takes a list of inflections and indexes them by merchant, panel and type, sorted by date. It answers questions like "what were the inflections for Netflix, PANEL_1, CREDIT in January 2015?" or "what were the 10 most severe ones?" without scanning the whole list.
 
 # In[487]:
 
@@ -200,6 +214,11 @@ rawData
 import numpy as np
 import pandas as pd
 import csv
+import heapq
+import json
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 class Inflection:
     """
@@ -215,8 +234,124 @@ class Inflection:
         self.sales = s
         self.secondDerivValue = v
         self.streak = st
-        
-class InflectionAnalysis:        
+
+"""
+Pruned exact linear time (PELT) change-point detection for a single series, with the cost of a segment being the sum of
+squared deviations from its mean (so a change point is a shift in the level of sales). F[t] is the cost of the best
+segmentation of the first t values, where each segment also pays the penalty. Candidates for the start of the last
+segment that can never be part of an optimal segmentation again are pruned as we go, which keeps the search close to
+linear. Returns the positions where new segments start. This is a plain function rather than a method so that it can be
+sent to worker processes.
+"""
+def peltChangePoints(x,penalty):
+    n = len(x)
+    cs = np.concatenate([[0.0],np.cumsum(x)])
+    cs2 = np.concatenate([[0.0],np.cumsum(np.square(x))])
+    F = np.empty(n + 1)
+    F[0] = -penalty
+    last = np.zeros(n + 1,dtype = np.int64)
+    candidates = np.array([0],dtype = np.int64)
+    for t in range(1,n + 1):
+        costs = (cs2[t] - cs2[candidates]) - np.square(cs[t] - cs[candidates])/(t - candidates)
+        totals = F[candidates] + costs + penalty
+        best = np.argmin(totals)
+        F[t] = totals[best]
+        last[t] = candidates[best]
+        candidates = np.append(candidates[F[candidates] + costs <= F[t]],t)
+    changes = []
+    t = n
+    while t > 0:
+        t = last[t]
+        if t > 0:
+            changes.append(t)
+    return np.array(changes[::-1],dtype = np.int64)
+
+class StageTimer:
+    """
+    Times one stage of a run for an InflectionProfile. It is used in a with block, and the number of rows the stage handled
+    can be set on it before the block ends if it is not known up front.
+    """
+    def __init__(self,profile,key,rows):
+        self.profile = profile
+        self.key = key
+        self.rows = rows
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self,*args):
+        self.profile.record(self.key,time.perf_counter() - self.started,self.rows)
+        return False
+
+class NullStage:
+    """
+    Stands in for a StageTimer when profiling is turned off, so the timed code runs the same way with nothing recorded.
+    """
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        return False
+
+class InflectionProfile:
+    """
+    A class for recording where the time goes in an InflectionAnalysis. For every stage (load, fixDate, grouping,
+    firstDerivative, secondDerivative, scan and statistics) and every approach and partition it was run with, we keep the
+    number of times it ran, the total wall time in seconds and the total number of rows it handled. When profiling is
+    turned off, stage hands back a shared NullStage and nothing is timed.
+    """
+    def __init__(self,enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.nullStage = NullStage()
+
+    def stage(self,name,approach="",partition="",rows=0):
+        if not self.enabled:
+            return self.nullStage
+        return StageTimer(self,(name,approach,partition),rows)
+
+    def record(self,key,seconds,rows):
+        calls,total,totalRows = self.stages.get(key,(0,0.0,0))
+        self.stages[key] = (calls + 1,total + seconds,totalRows + rows)
+
+    def reset(self):
+        self.stages = {}
+
+    """
+    Returns the recorded stages as a list of dictionaries, one per (stage, approach, partition), in the order the stages
+    were first seen.
+    """
+    def report(self):
+        rows = []
+        for (name,approach,partition),(calls,seconds,totalRows) in self.stages.items():
+            rows.append({"Stage":name,"Approach":approach,"Partition":partition,"Calls":calls,"Seconds":seconds,
+                         "Rows":totalRows,"RowsPerSecond":totalRows/seconds if seconds > 0 else None})
+        return rows
+
+    def toDataFrame(self):
+        return pd.DataFrame(self.report(),columns = ["Stage","Approach","Partition","Calls","Seconds","Rows","RowsPerSecond"])
+
+    """
+    Exports the report as JSON. If a file name is given the JSON is also written there.
+    """
+    def toJson(self,fileName=None):
+        text = json.dumps(self.report(),indent = 2)
+        if fileName is not None:
+            with open(fileName,"w") as f:
+                f.write(text)
+        return text
+
+class InflectionAnalysis:
+    """
+    How far the second derivative stencil reaches for each approach, as (rows behind, rows ahead) of the row being
+    differentiated. The forward approach looks two rows ahead, the backward approach two rows behind, and so on. We use
+    this to work out which part of a series has to be recomputed when new rows are merged in.
+    """
+    stencilReach = {"forward":(0,2),"backward":(2,0),"3point":(2,2),"5point":(4,4)}
+
     """
     Function takes in a Pandas dataframe with two columns and outputs a new dataframe with the following column additions:
 
@@ -238,7 +373,7 @@ class InflectionAnalysis:
             data.Sales.shift(periods = -1).multiply(8)).add(
             data.Sales.shift(periods = -2).multiply(-1)).divide(12*h)
         return data.copy()
-    
+
     """
     Helper function that repairs the dates in the raw data file to be properly formatted.
     """
@@ -251,350 +386,855 @@ class InflectionAnalysis:
             return x[0:3] + "0" + x[3:]
         else:
             return x
-    
+
+    """
+    Applies fixDate to a column of raw date strings and converts the result to datetimes. There are only a few thousand
+    distinct dates in the data, so each distinct string is fixed and parsed once and the results are spread back over the
+    rows.
+    """
+    def fixDates(self,dates):
+        with self.profile.stage("fixDate",rows = len(dates)):
+            codes,uniques = pd.factorize(dates)
+            fixed = pd.to_datetime(pd.Series(uniques).apply(self.fixDate)).to_numpy()
+            return pd.Series(fixed[codes],index = dates.index)
+
+    """
+    Reads the data file in chunks of chunksize rows, so that files larger than memory can be analysed. Only the columns we
+    use are read, with explicit types, and each chunk is summed by (Merchant, FixedDate, Panel, Type) as soon as it is
+    read. The partial sums are combined whenever they grow past maxPartialRows, so memory is bounded by the number of
+    distinct groups rather than by the number of rows in the file. When there are nearly as many groups as rows, what is
+    left after combining can already be past maxPartialRows, so we then wait until the partial sums have doubled before
+    combining again, which keeps the total work proportional to the size of the file. The result has one row per group with the total Sales,
+    which is all that the analysis needs.
+    """
+    def loadChunked(self,fileName,chunksize=1000000,maxPartialRows=None):
+        keys = ["Merchant","FixedDate","Panel","Type"]
+        if maxPartialRows is None:
+            maxPartialRows = 4*chunksize
+        partials = []
+        pending = 0
+        limit = maxPartialRows
+        for chunk in pd.read_csv(fileName,usecols = ["Date","Merchant","Panel","Type","Sales"],chunksize = chunksize,
+                                 dtype = {"Date":str,"Merchant":str,"Panel":str,"Type":str,"Sales":np.float64}):
+            chunk["FixedDate"] = self.fixDates(chunk.Date)
+            partials.append(chunk.groupby(keys)["Sales"].sum())
+            pending += len(partials[-1])
+            if pending > limit:
+                partials = [pd.concat(partials).groupby(level = keys).sum()]
+                pending = len(partials[0])
+                limit = max(maxPartialRows,2*pending)
+        if len(partials) == 0:
+            return pd.DataFrame({"Merchant":[],"FixedDate":pd.to_datetime([]),"Panel":[],"Type":[],"Sales":[]})
+        return pd.concat(partials).groupby(level = keys).sum().reset_index()
+
     """
     Helper function used to tell if a value is NaN.
     """
     def isNan(self,num):
         return num != num
 
+    """
+    Helper function that picks the column for the chosen approach out of a frame returned by FirstDerivative.
+    """
+    def derivativeFor(self,D,approach):
+        if approach == "forward":
+            return D.FirstDerivative_Forward
+        elif approach == "backward":
+            return D.FirstDerivative_Backward
+        elif approach == "3point":
+            return D.ThreePointFormula
+        elif approach == "5point":
+            return D.FivePointFormula
+        return pd.Series(dtype = float)
+
+    """
+    Calculates the second derivative of a one column (Sales) frame by taking the first derivative twice with the chosen
+    approach.
+    """
+    def secondDerivative(self,sales,approach):
+        D1_aux = self.derivativeFor(self.FirstDerivative(sales),approach).to_frame("Sales")
+        return self.derivativeFor(self.FirstDerivative(D1_aux),approach)
+
+    """
+    Helper function that returns the (merchant, panel, type) series that a partition option runs over, in the order
+    that detectInflections reports them.
+    """
+    def seriesKeys(self,partition):
+        if partition == "none":
+            return [(m,"Not Applicable","Not Applicable") for m in self.merchants]
+        elif partition == "panel":
+            return [(m,p,"Not Applicable") for m in self.merchants for p in self.panels]
+        elif partition == "ttype":
+            return [(m,"Not Applicable",t) for m in self.merchants for t in self.ttypes]
+        elif partition == "all":
+            return [(m,p,t) for m in self.merchants for p in self.panels for t in self.ttypes]
+        return []
+
+    """
+    Helper function that splits the data used by a partition option into one frame per series. The split is done once
+    with a single groupby and cached, instead of filtering the whole frame again for every series.
+    """
+    def seriesFrames(self,partition):
+        if partition not in self.seriesCache:
+            with self.profile.stage("grouping",partition = partition,rows = len(self.rawData)):
+                self.seriesCache[partition] = self.splitSeries(partition)
+        return self.seriesCache[partition]
+
+    """
+    Helper function for seriesFrames that does the split for one partition option.
+    """
+    def splitSeries(self,partition):
+        if partition == "none":
+            groups = self.groupedByBoth.groupby("Merchant",sort=False,observed=True)
+            frames = {(m,"Not Applicable","Not Applicable"): V for m,V in groups}
+        elif partition == "panel":
+            groups = self.groupedByPanel.groupby(["Merchant","Panel"],sort=False,observed=True)
+            frames = {(m,p,"Not Applicable"): V for (m,p),V in groups}
+        elif partition == "ttype":
+            groups = self.groupedByType.groupby(["Merchant","Type"],sort=False,observed=True)
+            frames = {(m,"Not Applicable",t): V for (m,t),V in groups}
+        else:
+            groups = self.rawData.groupby(["Merchant","Panel","Type"],sort=False,observed=True)
+            frames = {(m,p,t): V for (m,p,t),V in groups}
+        return frames
+
+    """
+    Returns the rows for a single series, re-indexed from 0 so that positions line up with the derivative series.
+    """
+    def seriesData(self,partition,m,p,t):
+        V = self.seriesFrames(partition).get((m,p,t))
+        if V is None:
+            return self.rawData.iloc[0:0].reset_index(drop=True)
+        return V.reset_index(drop=True)
+
+    """
+    Traverses the second derivative values of one series to get the changes in concavity. The scan can be resumed part of
+    the way through a series by passing the position to start from along with the sign and streak that were in effect
+    just before it. We return the inflections found (paired with their positions in the series) and the sign and streak
+    after every position we visited, so that a later scan can pick up from any of them.
+    """
+    def scanSeries(self,m,p,t,V,secondDerivatives,start=0,sign=0.5,streak=0):
+        found = []
+        signs = np.empty(len(secondDerivatives))
+        streaks = np.empty(len(secondDerivatives),dtype = np.int64)
+        for k in range(len(secondDerivatives)):
+            v = secondDerivatives[k]
+            i = start + k
+            if not self.isNan(v):
+                if sign == 0.5:
+                    sign = np.sign(v)
+                    if v == 0:
+                        found.append((i,Inflection(m,V['FixedDate'].iloc[i],p,t,V['Sales'].iloc[i],v,streak)))
+                else:
+                    if v == 0 or np.sign(v) != sign:
+                        found.append((i,Inflection(m,V['FixedDate'].iloc[i],p,t,V['Sales'].iloc[i],v,streak)))
+                        streak = 0
+                    else:
+                        streak += 1
+                sign = np.sign(v)
+            signs[k] = sign
+            streaks[k] = streak
+        return found,signs,streaks
+
+    """
+    Builds the dense calendar array used by the tensor backend. Sales are summed into a merchant x panel x type x date
+    NumPy array with one slot per calendar day between the first and last date in the data. Partitions that do not split on
+    panel or type get a single slot on that axis, so the sums match the grouped frames. Days with no rows at all are NaN
+    rather than 0, so that a missing day is never mistaken for a day with no sales. The arrays are cached per partition.
+    """
+    def salesTensor(self,partition="all"):
+        if partition not in self.tensorCache:
+            firstDay = self.rawData.FixedDate.min()
+            day = ((self.rawData.FixedDate - firstDay) // pd.Timedelta(days = 1)).to_numpy()
+            m = pd.Categorical(self.rawData.Merchant,categories = self.merchants).codes
+            p = pd.Categorical(self.rawData.Panel,categories = self.panels).codes
+            t = pd.Categorical(self.rawData.Type,categories = self.ttypes).codes
+            shape = [len(self.merchants),len(self.panels),len(self.ttypes),int(day.max()) + 1]
+            if partition in ("none","ttype"):
+                p = np.zeros_like(p)
+                shape[1] = 1
+            if partition in ("none","panel"):
+                t = np.zeros_like(t)
+                shape[2] = 1
+            flat = np.ravel_multi_index((m,p,t,day),shape)
+            size = int(np.prod(shape))
+            total = np.bincount(flat,weights = self.rawData.Sales.to_numpy(dtype = float),minlength = size)
+            present = np.bincount(flat,minlength = size) > 0
+            self.tensorCache[partition] = (firstDay,np.where(present,total,np.nan).reshape(shape))
+        return self.tensorCache[partition]
+
+    """
+    Flattens the calendar array for a partition into one row per series, in the same order as seriesKeys, along with the
+    day (counted from the first date) that every column of every row refers to. There are two ways of handling missing days:
+
+        -skip: the days that are present are packed to the front of each row, so a stencil steps from one recorded day to
+        the next. This is exactly what the pandas backend does, since it works on consecutive rows.
+        -calendar: every column is a calendar day, so any stencil that touches a missing day gives NaN and no derivative
+        is taken across a gap.
+    """
+    def seriesMatrix(self,partition,missingDays="skip"):
+        firstDay,values = self.salesTensor(partition)
+        X = values.reshape(-1,values.shape[-1])
+        if missingDays == "skip":
+            days = np.argsort(np.isnan(X),axis = 1,kind = "stable")
+            X = np.take_along_axis(X,days,axis = 1)
+        else:
+            days = np.broadcast_to(np.arange(X.shape[1]),X.shape)
+        return firstDay,X,days
+
+    """
+    Helper function that shifts every row of a 2D array by k columns, filling with NaN. It works like the pandas shift
+    that FirstDerivative uses, but on all of the series at once.
+    """
+    def shiftColumns(self,X,k):
+        shifted = np.full(X.shape,np.nan)
+        if k > 0:
+            shifted[:,k:] = X[:,:-k]
+        elif k < 0:
+            shifted[:,:k] = X[:,-k:]
+        else:
+            shifted[:] = X
+        return shifted
+
+    """
+    The same four formulas as FirstDerivative, applied along the rows of a 2D array so that every series is differentiated
+    with a handful of whole-array operations.
+    """
+    def tensorDerivative(self,X,approach,h=1):
+        if approach == "forward":
+            return (X - self.shiftColumns(X,-1))/h*-1
+        elif approach == "backward":
+            return (X - self.shiftColumns(X,1))/h
+        elif approach == "3point":
+            return (self.shiftColumns(X,-1) + self.shiftColumns(X,1)*-1)/(2*h)
+        elif approach == "5point":
+            return (self.shiftColumns(X,2) + self.shiftColumns(X,1)*-8 + self.shiftColumns(X,-1)*8 +
+                    self.shiftColumns(X,-2)*-1)/(12*h)
+        return np.full(X.shape,np.nan)
+
+    """
+    The concavity scan from scanSeries done for every row of a 2D array of second derivatives at once. A value is an
+    inflection if it is zero or its sign differs from the previous value that is not NaN (or, for the first value in a row,
+    if it is zero). The streak is the number of values since the last inflection that kept the sign, which we get from a
+    running count. Returns the row, column and streak of every inflection in row order.
+    """
+    def scanMatrix(self,D2):
+        valid = ~np.isnan(D2)
+        sign = np.sign(D2)
+        lastValid = np.maximum.accumulate(np.where(valid,np.arange(D2.shape[1]),-1),axis = 1)
+        previous = np.full(D2.shape,-1)
+        previous[:,1:] = lastValid[:,:-1]
+        hasPrevious = previous >= 0
+        previousSign = np.take_along_axis(sign,np.maximum(previous,0),axis = 1)
+        flip = valid & hasPrevious & ((D2 == 0) | (sign != previousSign))
+        first = valid & ~hasPrevious & (D2 == 0)
+        counts = np.cumsum(valid & hasPrevious & ~flip,axis = 1)
+        rows,cols = np.nonzero(flip | first)
+        reached = counts[rows,cols]
+        before = np.concatenate([[0],reached[:-1]])
+        before[np.concatenate([[True],rows[1:] != rows[:-1]])] = 0
+        return rows,cols,(reached - before).tolist()
+
+    """
+    Helper function that turns positions in a packed series matrix back into Inflection objects, using the series keys for
+    the partition and the day that every column refers to. The rows must be in order.
+    """
+    def inflectionsAt(self,partition,firstDay,X,days,rows,cols,values,streaks):
+        keys = self.seriesKeys(partition)
+        dates = (firstDay + pd.to_timedelta(days[rows,cols],unit = "D")).tolist()
+        sales = X[rows,cols].tolist()
+        inflections = []
+        for k,r in enumerate(rows.tolist()):
+            m,p,t = keys[r]
+            inflections.append(Inflection(m,dates[k],p,t,sales[k],values[k],streaks[k]))
+        return inflections
+
+    """
+    Helper function that turns the result of scanMatrix back into Inflection objects.
+    """
+    def inflectionsFromMatrix(self,partition,firstDay,X,days,D2):
+        rows,cols,streaks = self.scanMatrix(D2)
+        return self.inflectionsAt(partition,firstDay,X,days,rows,cols,D2[rows,cols].tolist(),streaks)
+
+    """
+    The tensor backend for detectInflections. Rather than running FirstDerivative and the scan once per series, it builds
+    the calendar array for the partition and takes both derivatives and the scan over every series together.
+    """
+    def detectInflectionsTensor(self,approach,partition,missingDays="skip"):
+        self.inflections = []
+        if partition not in ("none","panel","ttype","all") or len(self.rawData) == 0:
+            return
+        with self.profile.stage("grouping",approach,partition,len(self.rawData)):
+            firstDay,X,days = self.seriesMatrix(partition,missingDays)
+        with self.profile.stage("firstDerivative",approach,partition,X.size):
+            D1 = self.tensorDerivative(X,approach)
+        with self.profile.stage("secondDerivative",approach,partition,X.size):
+            D2 = self.tensorDerivative(D1,approach)
+        with self.profile.stage("scan",approach,partition,X.size):
+            self.inflections = self.inflectionsFromMatrix(partition,firstDay,X,days,D2)
+
+    """
+    Returns the first derivative formula for an approach as a dictionary from row offset to weight. The scale is the number
+    of rows that the formula steps over (and so also its h), so a scale of 1 is the formula used by FirstDerivative and a
+    scale of 7 compares values a week apart.
+    """
+    def derivativeKernel(self,approach,scale=1):
+        k = scale
+        if approach == "forward":
+            return {0:-1/k,k:1/k}
+        elif approach == "backward":
+            return {-k:-1/k,0:1/k}
+        elif approach == "3point":
+            return {-k:-1/(2*k),k:1/(2*k)}
+        elif approach == "5point":
+            return {-2*k:1/(12*k),-k:-8/(12*k),k:8/(12*k),2*k:-1/(12*k)}
+        return {}
+
+    """
+    Taking the first derivative twice is the same as applying the first derivative formula convolved with itself, so the
+    second derivative of an approach at a given scale can be written down as a single set of weights.
+    """
+    def secondDerivativeKernel(self,approach,scale=1):
+        first = self.derivativeKernel(approach,scale)
+        kernel = {}
+        for a,wa in first.items():
+            for b,wb in first.items():
+                kernel[a + b] = kernel.get(a + b,0) + wa*wb
+        return kernel
+
+    """
+    Weights for the Savitzky-Golay smoothed second derivative: a polynomial of the given order is fit by least squares to
+    the window of rows around each point, and the second derivative of that polynomial is taken at the centre. The window
+    must be odd and longer than the order, and the order must be at least 2.
+    """
+    def savitzkyGolayKernel(self,window,order):
+        if window % 2 == 0 or window <= order:
+            raise ValueError("The Savitzky-Golay window must be odd and longer than the order, got window {0} and "
+                             "order {1}.".format(window,order))
+        if order < 2:
+            raise ValueError("The Savitzky-Golay order must be at least 2 to have a second derivative, got {0}."
+                             .format(order))
+        half = window//2
+        offsets = np.arange(-half,half + 1)
+        fit = np.linalg.pinv(np.vander(offsets,order + 1,increasing = True))
+        return dict(zip(offsets.tolist(),(2*fit[2]).tolist()))
+
+    """
+    Applies a list of second derivative kernels to every row of a packed series matrix (see seriesMatrix with
+    missingDays = skip) in a single pass over the row offsets. The result has one layer per kernel. Like the pandas
+    formulas, a value is NaN wherever its kernel would reach past either end of the series.
+    """
+    def batchedSecondDerivatives(self,X,kernels):
+        lengths = (~np.isnan(X)).sum(axis = 1)
+        reach = max([abs(o) for kernel in kernels for o in kernel] + [0])
+        weights = np.zeros((len(kernels),2*reach + 1))
+        for j,kernel in enumerate(kernels):
+            for o,w in kernel.items():
+                weights[j,o + reach] = w
+        padded = np.pad(np.nan_to_num(X),((0,0),(reach,reach)))
+        D2 = np.zeros((len(kernels),) + X.shape)
+        for o in range(2*reach + 1):
+            if weights[:,o].any():
+                D2 += weights[:,o,None,None]*padded[None,:,o:o + X.shape[1]]
+        position = np.arange(X.shape[1])
+        for j,kernel in enumerate(kernels):
+            if len(kernel) == 0:
+                D2[j] = np.nan
+                continue
+            outside = (position + min(kernel) < 0)[None,:] | (position[None,:] + max(kernel) >= lengths[:,None])
+            D2[j][outside] = np.nan
+        return D2
+
+    """
+    Runs the detection at several scales at once. Every scale in scales gives the approach's second derivative stepping
+    over that many rows, and every (window, order) pair in savgol gives a Savitzky-Golay smoothed second derivative. All of
+    them are computed together with batchedSecondDerivatives and scanned with scanMatrix. The result is a dictionary from a
+    label such as "3point-h7" or "savgol-7-2" to the list of inflections for that scale, which is also kept in
+    multiScaleInflections. A scale of 1 gives the same inflections as detectInflections with the same approach.
+    """
+    def detectInflectionsMultiScale(self,approach="3point",partition="all",scales=[1,2,4,7],savgol=[(7,2)]):
+        labels = ["{0}-h{1}".format(approach,k) for k in scales] + ["savgol-{0}-{1}".format(w,o) for w,o in savgol]
+        kernels = [self.secondDerivativeKernel(approach,k) for k in scales] + [
+            self.savitzkyGolayKernel(w,o) for w,o in savgol]
+        self.multiScaleInflections = {label: [] for label in labels}
+        if partition not in ("none","panel","ttype","all") or len(self.rawData) == 0:
+            return self.multiScaleInflections
+        with self.profile.stage("grouping","multiscale",partition,len(self.rawData)):
+            firstDay,X,days = self.seriesMatrix(partition,"skip")
+        with self.profile.stage("secondDerivative","multiscale",partition,X.size*len(kernels)):
+            D2 = self.batchedSecondDerivatives(X,kernels)
+        for j,label in enumerate(labels):
+            with self.profile.stage("scan",label,partition,X.size):
+                self.multiScaleInflections[label] = self.inflectionsFromMatrix(partition,firstDay,X,days,D2[j])
+        return self.multiScaleInflections
+
+    """
+    Helper function that estimates the day to day noise of every row of a packed series matrix from the median absolute
+    difference between consecutive days. Unlike the standard deviation, this is barely moved by a shift in level or by a
+    trend. Rows that are too short (or flat) get a scale of 1.
+    """
+    def noiseScale(self,X):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore",RuntimeWarning)
+            scale = np.nanmedian(np.abs(np.diff(X,axis = 1)),axis = 1)/(0.6745*np.sqrt(2))
+        return np.where(scale > 0,scale,1.0)
+
+    """
+    Two-sided CUSUM change-point detection, run over every row of a packed series matrix at once. We step through the days
+    and, for all of the series together, compare each value with the mean of its current segment in units of its noise
+    scale. Deviations beyond drift are added up separately upwards and downwards, and when either sum passes threshold a
+    change is reported where that run of deviations began. The segment then starts again from there. Returns the row and
+    column of every change with the (signed) CUSUM value that set it off and the length of the segment before it, ordered
+    by row and then column.
+    """
+    def cusumChangePoints(self,X,threshold=5.0,drift=0.5):
+        S,D = X.shape
+        lengths = (~np.isnan(X)).sum(axis = 1)
+        scale = self.noiseScale(X)
+        cs = np.concatenate([np.zeros((S,1)),np.nancumsum(X,axis = 1)],axis = 1)
+        every = np.arange(S)
+        start = np.zeros(S,dtype = np.int64)
+        upper,lower = np.zeros(S),np.zeros(S)
+        upperStart,lowerStart = np.zeros(S,dtype = np.int64),np.zeros(S,dtype = np.int64)
+        rows,cols,values,streaks = [],[],[],[]
+        for t in range(1,D):
+            active = (t < lengths) & (t > start)
+            mean = (cs[every,t] - cs[every,start])/np.maximum(t - start,1)
+            z = np.where(active,(np.nan_to_num(X[:,t]) - mean)/scale,0)
+            upperStart = np.where(upper == 0,t,upperStart)
+            lowerStart = np.where(lower == 0,t,lowerStart)
+            upper = np.where(active,np.maximum(0,upper + z - drift),0)
+            lower = np.where(active,np.maximum(0,lower - z - drift),0)
+            alarm = np.nonzero((upper > threshold) | (lower > threshold))[0]
+            if len(alarm) > 0:
+                up = upper[alarm] >= lower[alarm]
+                began = np.where(up,upperStart[alarm],lowerStart[alarm])
+                rows.append(alarm)
+                cols.append(began)
+                values.append(np.where(up,upper[alarm],-lower[alarm]))
+                streaks.append(began - start[alarm])
+                start[alarm] = began
+                upper[alarm] = 0
+                lower[alarm] = 0
+        if len(rows) == 0:
+            return np.zeros(0,dtype = np.int64),np.zeros(0,dtype = np.int64),[],[]
+        rows,cols,values,streaks = [np.concatenate(x) for x in (rows,cols,values,streaks)]
+        order = np.lexsort((cols,rows))
+        return rows[order],cols[order],values[order].tolist(),streaks[order].tolist()
+
+    """
+    PELT change-point detection (see peltChangePoints) for every row of a packed series matrix. The penalty for each new
+    segment is penalty x noise^2 x log(n), using the noise scale of the series, so that the same setting works for big and
+    small merchants. PELT has to walk through each series in turn, so with workers set the series are shared out over a
+    pool of that many processes. Returns the same kind of result as cusumChangePoints, where the value is the change in the
+    mean level of sales from the segment before to the segment after.
+    """
+    def peltChangePointsAll(self,X,penalty=2.0,workers=None):
+        lengths = (~np.isnan(X)).sum(axis = 1)
+        scale = self.noiseScale(X)
+        series = [X[r,:lengths[r]] for r in range(X.shape[0])]
+        penalties = [penalty*scale[r]**2*np.log(max(lengths[r],2)) for r in range(X.shape[0])]
+        if workers is not None and workers > 1:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                found = list(executor.map(peltChangePoints,series,penalties,
+                                          chunksize = max(1,len(series)//(4*workers))))
+        else:
+            found = [peltChangePoints(x,pen) for x,pen in zip(series,penalties)]
+        rows,cols,values,streaks = [],[],[],[]
+        for r,changes in enumerate(found):
+            bounds = [0] + changes.tolist() + [lengths[r]]
+            for k in range(1,len(bounds) - 1):
+                rows.append(r)
+                cols.append(bounds[k])
+                values.append(float(series[r][bounds[k]:bounds[k + 1]].mean() - series[r][bounds[k - 1]:bounds[k]].mean()))
+                streaks.append(bounds[k] - bounds[k - 1])
+        return np.array(rows,dtype = np.int64),np.array(cols,dtype = np.int64),values,streaks
+
+    """
+    Finds change points instead of changes in concavity, for every (merchant, panel, type) series of a partition. The
+    method is either cusum or pelt, and the results are Inflection objects like those from detectInflections (the
+    secondDerivValue holds the CUSUM value or the change in mean level, and the streak is the number of days since the
+    previous change point), so that the two kinds of detection can be compared with the same tools. detectInflections
+    calls this when its approach is cusum or pelt.
+    """
+    def detectChangePoints(self,method="cusum",partition="all",threshold=5.0,drift=0.5,penalty=2.0,workers=None):
+        self.inflections = []
+        if partition not in ("none","panel","ttype","all") or len(self.rawData) == 0:
+            return
+        with self.profile.stage("grouping",method,partition,len(self.rawData)):
+            firstDay,X,days = self.seriesMatrix(partition,"skip")
+        with self.profile.stage("scan",method,partition,X.size):
+            if method == "cusum":
+                rows,cols,values,streaks = self.cusumChangePoints(X,threshold,drift)
+            elif method == "pelt":
+                rows,cols,values,streaks = self.peltChangePointsAll(X,penalty,workers)
+            else:
+                return
+            self.inflections = self.inflectionsAt(partition,firstDay,X,days,rows,cols,values,streaks)
+
     """
         This is going to run the algorithm to detect inflections. It has several parameters:
-        
+
             -approach: indicates whether you want to use the forward, backward, 3point, or 5point methods. Takes three
             possible values:
                 -forward
                 -backward
                 -3point
                 -5point
-            
+            It can also be cusum or pelt, which finds change points with detectChangePoints instead.
+
             -verbose: indicates whether or not you want to print out progress messages. Useful primarily for debugging.
             Takes values True and False.
-            
+
             -partition: indicates whether you want to partition the data. Partitioning means that you will split the data
                 based on panel or transaction type. There are four possibilities:
                     -panel (partition by panel only),
                     -ttype (partition by transaction type only),
                     -all (partition by panel and transaction type), and
                     -none (do no partitioning at all).
+
+            -backend: how the derivatives are calculated. There are two possibilities:
+                    -pandas (run FirstDerivative and the scan one series at a time), and
+                    -tensor (pivot every series into one dense array and process them all together, see
+                    detectInflectionsTensor).
+
+            -missingDays: only used by the tensor backend, see seriesMatrix. Takes the values skip and calendar.
+
+        The scan state of every series is kept in seriesState so that appendData can later update the results without
+        running the whole detection again.
     """
-    def detectInflections(self,approach="forward",verbose=False,partition="all"):
+    def detectInflections(self,approach="forward",verbose=False,partition="all",backend="pandas",missingDays="skip"):
         #prep for the next run.
         if verbose:
             print("Clearing out previous inflections.")
         self.inflections = []
+        self.seriesState = {}
+        self.lastRun = (approach,partition,backend,missingDays)
         numRowsProcessed = 0
         lineSplit = "--------------------------------------------------------------"
-        
+
         if verbose:
             print("We are about to proceed with the {0} approach and the {1} partition option.".format(approach,partition))
             print(lineSplit)
-        
-        #Here we split on the partition method.
-        if partition == "none":
-            t = "Not Applicable"
-            p = "Not Applicable"
-            for m in self.merchants:
-                if verbose:
-                    print("We are now processing merchant: {0}, panel is {1} and type is {2}.".format(m,p,t))
-                V = self.groupedByBoth[(self.groupedByBoth.Merchant==m)]
-                if verbose:
-                    print("The number of rows in the raw data altogether is {0}.".format(list(V.shape)[0]))
-                newIndex = [x for x in range(0,list(V.shape)[0])]
-                V["NewIndex"] = newIndex
-                V = V.set_index("NewIndex")
-                sales = V.Sales
-                sales = sales.to_frame("Sales")
-                if verbose:
-                    print("The size of sales is {0}.".format(list(sales.shape)[0]))
-
-                #Calculate the first derivative.
-                D1 = self.FirstDerivative(sales)
-                D1_aux = pd.Series()
-                if verbose:
-                    print("After taking first derivatives, we have {0} rows.".format(list(D1.shape)[0]))
-                if approach == "forward":
-                    D1_aux = D1.FirstDerivative_Forward
-                elif approach == "backward":
-                    D1_aux = D1.FirstDerivative_Backward
-                elif approach == "3point":
-                    D1_aux = D1.ThreePointFormula
-                elif approach == "5point":
-                    D1_aux = D1.FivePointFormula
-                D1_aux = D1_aux.to_frame("Sales")
-
-                #Calculate the second derivative.
-                D2 = self.FirstDerivative(D1_aux)
-                secondDerivatives = pd.Series()
-                if approach == "forward":
-                    secondDerivatives = D2.FirstDerivative_Forward
-                elif approach == "backward":
-                    secondDerivatives = D2.FirstDerivative_Backward
-                elif approach == "3point":
-                    secondDerivatives = D2.ThreePointFormula
-                elif approach == "5point":
-                    secondDerivatives = D2.FivePointFormula
-                if verbose:
-                    print("After taking second derivatives, we have {0} rows.".format(list(D2.shape)[0]))
-                    print("We are now calculating the inflection points.")
-
-                #traverse the second derivative values to get the change in concavity for the function.
-                sign = 0.5
-                streak = 0
-                for i in secondDerivatives.iteritems():
-                    l = list(i)
-                    if not self.isNan(l[1]):
-                        if sign == 0.5:
-                            sign = np.sign(l[1])
-                            if l[1] == 0:
-                                self.inflections.append(
-                                    Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                        else:
-                            if l[1] == 0 or np.sign(l[1]) != sign:
-                                self.inflections.append(
-                                    Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                                streak = 0
-                            else:
-                                streak += 1
-                        sign = np.sign(l[1])
-                    numRowsProcessed += 1
-                if verbose:
-                    print("We have so far processed {0} rows.".format(numRowsProcessed))
-                    print(lineSplit)    
-        
-        elif partition == "panel":
-            t = "Not Applicable"
-            for m in self.merchants:
-                for p in self.panels:
-                    if verbose:
-                        print("We are now processing merchant: {0}, panel is {1} and type is {2}.".format(m,p,t))
-                    V = self.groupedByPanel[(self.groupedByPanel.Merchant==m)&(self.groupedByPanel.Panel==p)]
-                    if verbose:
-                        print("The number of rows in the raw data altogether is {0}.".format(list(V.shape)[0]))
-                    newIndex = [x for x in range(0,list(V.shape)[0])]
-                    V["NewIndex"] = newIndex
-                    V = V.set_index("NewIndex")
-                    sales = V.Sales
-                    sales = sales.to_frame("Sales")
-                    if verbose:
-                        print("The size of sales is {0}.".format(list(sales.shape)[0]))
-
-                    #Calculate the first derivative.
-                    D1 = self.FirstDerivative(sales)
-                    D1_aux = pd.Series()
-                    if verbose:
-                        print("After taking first derivatives, we have {0} rows.".format(list(D1.shape)[0]))
-                    if approach == "forward":
-                        D1_aux = D1.FirstDerivative_Forward
-                    elif approach == "backward":
-                        D1_aux = D1.FirstDerivative_Backward
-                    elif approach == "3point":
-                        D1_aux = D1.ThreePointFormula
-                    elif approach == "5point":
-                        D1_aux = D1.FivePointFormula
-                    D1_aux = D1_aux.to_frame("Sales")
-
-                    #Calculate the second derivative.
-                    D2 = self.FirstDerivative(D1_aux)
-                    secondDerivatives = pd.Series()
-                    if approach == "forward":
-                        secondDerivatives = D2.FirstDerivative_Forward
-                    elif approach == "backward":
-                        secondDerivatives = D2.FirstDerivative_Backward
-                    elif approach == "3point":
-                        secondDerivatives = D2.ThreePointFormula
-                    elif approach == "5point":
-                        secondDerivatives = D2.FivePointFormula
-                    if verbose:
-                        print("After taking second derivatives, we have {0} rows.".format(list(D2.shape)[0]))
-                        print("We are now calculating the inflection points.")
-                    
-                    #traverse the second derivative values to get the change in concavity for the function.
-                    sign = 0.5
-                    streak = 0
-                    for i in secondDerivatives.iteritems():
-                        l = list(i)
-                        if not self.isNan(l[1]):
-                            if sign == 0.5:
-                                sign = np.sign(l[1])
-                                if l[1] == 0.5:
-                                    self.inflections.append(
-                                        Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                            else:
-                                if l[1] == 0 or np.sign(l[1]) != sign:
-                                    self.inflections.append(
-                                        Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                                    streak = 0
-                                else:
-                                    streak += 1
-                            sign = np.sign(l[1])
-                        numRowsProcessed += 1
-                    if verbose:
-                        print("We have so far processed {0} rows.".format(numRowsProcessed))
-                        print(lineSplit)            
-            
-        elif partition == "ttype":
-            p = "Not Applicable"
-            for m in self.merchants:
-                for t in self.ttypes:
-                    if verbose:
-                        print("We are now processing merchant: {0}, panel is {1} and type is {2}.".format(m,p,t))
-                    V = self.groupedByType[(self.groupedByType.Merchant==m)&(self.groupedByType.Type==t)]
-                    if verbose:
-                        print("The number of rows in the raw data altogether is {0}.".format(list(V.shape)[0]))
-                    newIndex = [x for x in range(0,list(V.shape)[0])]
-                    V["NewIndex"] = newIndex
-                    V = V.set_index("NewIndex")
-                    sales = V.Sales
-                    sales = sales.to_frame("Sales")
-                    if verbose:
-                        print("The size of sales is {0}.".format(list(sales.shape)[0]))
-
-                    #Calculate the first derivative.
-                    D1 = self.FirstDerivative(sales)
-                    D1_aux = pd.Series()
-                    if verbose:
-                        print("After taking first derivatives, we have {0} rows.".format(list(D1.shape)[0]))
-                    if approach == "forward":
-                        D1_aux = D1.FirstDerivative_Forward
-                    elif approach == "backward":
-                        D1_aux = D1.FirstDerivative_Backward
-                    elif approach == "3point":
-                        D1_aux = D1.ThreePointFormula
-                    elif approach == "5point":
-                        D1_aux = D1.FivePointFormula
-                    D1_aux = D1_aux.to_frame("Sales")
-
-                    #Calculate the second derivative.
-                    D2 = self.FirstDerivative(D1_aux)
-                    secondDerivatives = pd.Series()
-                    if approach == "forward":
-                        secondDerivatives = D2.FirstDerivative_Forward
-                    elif approach == "backward":
-                        secondDerivatives = D2.FirstDerivative_Backward
-                    elif approach == "3point":
-                        secondDerivatives = D2.ThreePointFormula
-                    elif approach == "5point":
-                        secondDerivatives = D2.FivePointFormula
-                    if verbose:
-                        print("After taking second derivatives, we have {0} rows.".format(list(D2.shape)[0]))
-                        print("We are now calculating the inflection points.")
-                    
-                    #traverse the second derivative values to get the change in concavity for the function.
-                    sign = 0.5
-                    streak = 0
-                    for i in secondDerivatives.iteritems():
-                        l = list(i)
-                        if not self.isNan(l[1]):
-                            if sign == 0.5:
-                                sign = np.sign(l[1])
-                                if l[1] == 0:
-                                    self.inflections.append(
-                                        Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                            else:
-                                if l[1] == 0 or np.sign(l[1]) != sign:
-                                    self.inflections.append(
-                                        Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                                    streak = 0
-                                else:
-                                    streak += 1
-                            sign = np.sign(l[1])
-                        numRowsProcessed += 1
-                    if verbose:
-                        print("We have so far processed {0} rows.".format(numRowsProcessed))
-                        print(lineSplit)
-                           
-        elif partition == "all":
-            for m in self.merchants:
-                for p in self.panels:
-                    for t in self.ttypes:
-                        if verbose:
-                            print("We are now processing merchant: {0}, panel is {1} and type is {2}.".format(m,p,t))
-                        V = self.rawData[(self.rawData.Merchant==m)&(self.rawData.Panel==p)&(self.rawData.Type==t)]
-                        if verbose:
-                            print("The number of rows in the raw data altogether is {0}.".format(list(V.shape)[0]))
-                        newIndex = [x for x in range(0,list(V.shape)[0])]
-                        V["NewIndex"] = newIndex
-                        V = V.set_index("NewIndex")
-                        sales = V.Sales
-                        sales = sales.to_frame("Sales")
-                        if verbose:
-                            print("The size of sales is {0}.".format(list(sales.shape)[0]))
-                        
-                        #Calculate the first derivative.
-                        D1 = self.FirstDerivative(sales)
-                        D1_aux = pd.Series()
-                        if verbose:
-                            print("After taking first derivatives, we have {0} rows.".format(list(D1.shape)[0]))
-                        if approach == "forward":
-                            D1_aux = D1.FirstDerivative_Forward
-                        elif approach == "backward":
-                            D1_aux = D1.FirstDerivative_Backward
-                        elif approach == "3point":
-                            D1_aux = D1.ThreePointFormula
-                        elif approach == "5point":
-                            D1_aux = D1.FivePointFormula
-                        D1_aux = D1_aux.to_frame("Sales")
-                        
-                        #Calculate the second derivative.
-                        D2 = self.FirstDerivative(D1_aux)
-                        secondDerivatives = pd.Series()
-                        if approach == "forward":
-                            secondDerivatives = D2.FirstDerivative_Forward
-                        elif approach == "backward":
-                            secondDerivatives = D2.FirstDerivative_Backward
-                        elif approach == "3point":
-                            secondDerivatives = D2.ThreePointFormula
-                        elif approach == "5point":
-                            secondDerivatives = D2.FivePointFormula
-                        if verbose:
-                            print("After taking second derivatives, we have {0} rows.".format(list(D2.shape)[0]))
-                            print("We are now calculating the inflection points.")
-                        
-                        #traverse the second derivative values to get the change in concavity for the function.
-                        sign = 0.5
-                        streak = 0
-                        for i in secondDerivatives.iteritems():
-                            l = list(i)
-                            if not self.isNan(l[1]):
-                                if sign == 0.5:
-                                    sign = np.sign(l[1])
-                                    if l[1] == 0:
-                                        self.inflections.append(
-                                            Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                                else:
-                                    if l[1] == 0 or np.sign(l[1]) != sign:
-                                        self.inflections.append(
-                                            Inflection(m,V['FixedDate'].iloc[l[0]],p,t,V['Sales'].iloc[l[0]],l[1],streak))
-                                        streak = 0
-                                    else:
-                                        streak += 1
-                                sign = np.sign(l[1])
-                            numRowsProcessed += 1
-                        if verbose:
-                            print("We have so far processed {0} rows.".format(numRowsProcessed))
-                            print(lineSplit)
-
-    def __init__(self,fileName):
-        self.rawData = pd.read_csv(fileName)
-        self.rawData["FixedDate"] = pd.to_datetime(self.rawData.Date.apply(fixDate))
-        self.rawData.sort_values(by = ['Merchant','FixedDate'],inplace=True)
-        self.merchants = self.rawData.Merchant.unique()
-        self.panels = self.rawData.Panel.unique()
-        self.ttypes = self.rawData.Type.unique()
+
+        if approach in ("cusum","pelt"):
+            self.detectChangePoints(approach,partition)
+            if verbose:
+                print("We found {0} change points.".format(len(self.inflections)))
+            return
+
+        if backend == "tensor":
+            self.detectInflectionsTensor(approach,partition,missingDays)
+            if verbose:
+                print("We found {0} inflections with the tensor backend.".format(len(self.inflections)))
+            return
+
+        #Here we split on the partition method and run every series it produces.
+        for (m,p,t) in self.seriesKeys(partition):
+            if verbose:
+                print("We are now processing merchant: {0}, panel is {1} and type is {2}.".format(m,p,t))
+            V = self.seriesData(partition,m,p,t)
+            if verbose:
+                print("The number of rows in the raw data altogether is {0}.".format(list(V.shape)[0]))
+            sales = V.Sales
+            sales = sales.to_frame("Sales")
+            if verbose:
+                print("The size of sales is {0}.".format(list(sales.shape)[0]))
+
+            #Calculate the first derivative.
+            with self.profile.stage("firstDerivative",approach,partition,len(sales)):
+                D1_aux = self.derivativeFor(self.FirstDerivative(sales),approach).to_frame("Sales")
+            if verbose:
+                print("After taking first derivatives, we have {0} rows.".format(len(D1_aux)))
+
+            #Calculate the second derivative.
+            with self.profile.stage("secondDerivative",approach,partition,len(sales)):
+                secondDerivatives = self.derivativeFor(self.FirstDerivative(D1_aux),approach)
+            if verbose:
+                print("After taking second derivatives, we have {0} rows.".format(len(secondDerivatives)))
+                print("We are now calculating the inflection points.")
+
+            #traverse the second derivative values to get the change in concavity for the function.
+            with self.profile.stage("scan",approach,partition,len(secondDerivatives)):
+                found,signs,streaks = self.scanSeries(m,p,t,V,secondDerivatives.to_numpy())
+            self.seriesState[(m,p,t)] = (found,signs,streaks)
+            self.inflections.extend([x[1] for x in found])
+            numRowsProcessed += len(secondDerivatives)
+            if verbose:
+                print("We have so far processed {0} rows.".format(numRowsProcessed))
+                print(lineSplit)
+
+    """
+    Helper function that stores Merchant, Panel and Type as categoricals, which take far less memory than the same strings
+    repeated on every row, and refreshes the lists of merchants, panels and types.
+    """
+    def categorize(self):
+        for c in ("Merchant","Panel","Type"):
+            self.rawData[c] = self.rawData[c].astype("category")
+        self.merchants = np.asarray(self.rawData.Merchant.unique())
+        self.panels = np.asarray(self.rawData.Panel.unique())
+        self.ttypes = np.asarray(self.rawData.Type.unique())
+
+    """
+    The grouped views of the data are only built the first time a partition asks for them, and are then cached. Only the
+    Sales column is aggregated.
+    """
+    def groupedBy(self,keys):
+        if tuple(keys) not in self.groupedCache:
+            grouped = self.rawData.groupby(keys,as_index=False,observed=True)["Sales"].sum()
+            grouped.sort_values(by = ["Merchant","FixedDate"],inplace = True)
+            self.groupedCache[tuple(keys)] = grouped
+        return self.groupedCache[tuple(keys)]
+
+    #used for partition by panel.
+    @property
+    def groupedByPanel(self):
+        return self.groupedBy(["Merchant","FixedDate","Panel"])
+
+    #used for partition by type.
+    @property
+    def groupedByType(self):
+        return self.groupedBy(["Merchant","FixedDate","Type"])
+
+    #used for partition by both.
+    @property
+    def groupedByBoth(self):
+        return self.groupedBy(["Merchant","FixedDate"])
+
+    """
+    Helper function that merges newly summed rows into one of the grouped frames. Groups that already exist have their
+    sales added to, and new groups are appended before the frame is put back in (Merchant, FixedDate) order.
+    """
+    def mergeGrouped(self,grouped,newRows,keys):
+        grouped = grouped.copy()
+        newRows = newRows.copy()
+        for c in keys:
+            if c != "FixedDate":
+                grouped[c] = grouped[c].astype(self.rawData[c].dtype)
+                newRows[c] = newRows[c].astype(self.rawData[c].dtype)
+        added = newRows.groupby(keys,observed = True)["Sales"].sum()
+        merged = grouped.set_index(keys)
+        common = added.index.intersection(merged.index)
+        if len(common) > 0:
+            merged.loc[common,"Sales"] = merged.loc[common,"Sales"] + added[common]
+        merged = pd.concat([merged.reset_index(),added.drop(common).reset_index()],ignore_index=True)
+        merged.sort_values(by = ["Merchant","FixedDate"],inplace = True,kind = "mergesort")
+        return merged
+
+    """
+    Merges new rows (a file name or a frame with the same Date/Merchant/Panel/Type/Sales columns) into the analysis. Only
+    the new rows are date-fixed and grouped. If detectInflections has already been run, we then redo the derivatives for
+    just the tail of each touched series that the stencil can see the new rows from, and resume the concavity scan from
+    the state saved just before that tail. Inflections from the unchanged prefix are carried forward as they are.
+
+    If verify is True the incremental result is checked against a full recompute with verifyInflections, and the result
+    of that check is returned.
+    """
+    def appendData(self,newData,verify=False):
+        if isinstance(newData,str):
+            newData = pd.read_csv(newData)
+        newData = newData.copy()
+        newData["FixedDate"] = self.fixDates(newData.Date)
+
+        self.rawData = pd.concat([self.rawData,newData],ignore_index=True)
+        self.rawData.sort_values(by = ['Merchant','FixedDate'],inplace=True,kind = "mergesort")
+        self.categorize()
+        #only the grouped frames that have already been built need the new rows, the rest are built when first used.
+        for keys in list(self.groupedCache.keys()):
+            self.groupedCache[keys] = self.mergeGrouped(self.groupedCache[keys],newData,list(keys))
+        self.seriesCache = {}
+        self.tensorCache = {}
+
+        if self.lastRun is None:
+            return None
+        approach,partition,backend,missingDays = self.lastRun
+        if backend != "pandas" or approach not in self.stencilReach:
+            #the tensor backend and change-point detection process everything at once, so they are simply run again.
+            self.detectInflections(approach = approach,partition = partition,backend = backend,missingDays = missingDays)
+            return self.verifyInflections() if verify else None
+        behind,ahead = self.stencilReach.get(approach,(0,0))
+
+        #find the earliest new date in every series that the new rows touch.
+        touched = newData.copy()
+        if partition in ("none","ttype"):
+            touched["Panel"] = "Not Applicable"
+        if partition in ("none","panel"):
+            touched["Type"] = "Not Applicable"
+        earliest = touched.groupby(["Merchant","Panel","Type"]).FixedDate.min()
+
+        for (m,p,t),firstNewDate in earliest.items():
+            V = self.seriesData(partition,m,p,t)
+            found,signs,streaks = self.seriesState.get((m,p,t),([],np.empty(0),np.empty(0,dtype = np.int64)))
+
+            #the first row that changed, and the first second derivative that can see it.
+            changed = int(np.searchsorted(V.FixedDate.to_numpy(),np.datetime64(firstNewDate),side = "left"))
+            cut = min(max(changed - ahead,0),len(signs))
+            begin = max(cut - behind,0)
+            window = V.Sales.iloc[begin:].to_frame("Sales").reset_index(drop = True)
+            secondDerivatives = self.secondDerivative(window,approach).to_numpy()[cut - begin:]
+
+            sign = signs[cut - 1] if cut > 0 else 0.5
+            streak = int(streaks[cut - 1]) if cut > 0 else 0
+            tail,tailSigns,tailStreaks = self.scanSeries(m,p,t,V,secondDerivatives,cut,sign,streak)
+            self.seriesState[(m,p,t)] = ([x for x in found if x[0] < cut] + tail,
+                                         np.concatenate([signs[:cut],tailSigns]),
+                                         np.concatenate([streaks[:cut],tailStreaks]))
+
+        self.inflections = []
+        for key in self.seriesKeys(partition):
+            if key in self.seriesState:
+                self.inflections.extend([x[1] for x in self.seriesState[key][0]])
+
+        if verify:
+            return self.verifyInflections()
+        return None
+
+    """
+    Checks the current inflections against a full run of detectInflections with the same approach and partition. Returns
+    True if they agree. The full run replaces the current results either way, so after a failed check the analysis is left
+    holding the correct inflections.
+    """
+    def verifyInflections(self):
+        if self.lastRun is None:
+            return True
+        describe = lambda x: (x.merchant,x.date,x.panel,x.ttype,x.sales,x.secondDerivValue,x.streak)
+        incremental = [describe(x) for x in self.inflections]
+        approach,partition,backend,missingDays = self.lastRun
+        self.detectInflections(approach = approach,partition = partition,backend = backend,missingDays = missingDays)
+        return incremental == [describe(x) for x in self.inflections]
+
+    """
+    Loads the data file. By default the whole file is read at once; passing chunksize reads it in chunks with loadChunked,
+    which keeps memory down for files that do not fit in it. A DataFrame with the same columns as the file can be passed
+    in place of the file name. Passing profile = True records the time and rows for each stage of the work in
+    self.profile (an InflectionProfile).
+    """
+    def __init__(self,fileName,chunksize=None,profile=False):
+        self.profile = InflectionProfile(enabled = profile)
+        with self.profile.stage("load") as stage:
+            if isinstance(fileName,pd.DataFrame):
+                self.rawData = fileName.copy()
+                self.rawData["FixedDate"] = self.fixDates(self.rawData.Date)
+            elif chunksize is None:
+                self.rawData = pd.read_csv(fileName)
+                self.rawData["FixedDate"] = self.fixDates(self.rawData.Date)
+            else:
+                self.rawData = self.loadChunked(fileName,chunksize)
+            self.rawData.sort_values(by = ['Merchant','FixedDate'],inplace=True)
+            self.categorize()
+            stage.rows = len(self.rawData)
         self.inflections = []
-        
-        #used for partition by panel.
-        self.groupedByPanel = self.rawData.groupby(["Merchant","FixedDate","Panel"], as_index=False).sum()
-        self.groupedByPanel.sort_values(by = ["Merchant","FixedDate"],inplace = True)
-        
-        #used for partition by type.
-        self.groupedByType = self.rawData.groupby(["Merchant","FixedDate","Type"], as_index=False).sum()
-        self.groupedByType.sort_values(by = ["Merchant","FixedDate"],inplace = True)
-        
-        #used for partition by both.
-        self.groupedByBoth = self.rawData.groupby(["Merchant","FixedDate"], as_index=False).sum()
-        self.groupedByBoth.sort_values(by = ["Merchant","FixedDate"],inplace = True)
+        self.seriesState = {}
+        self.seriesCache = {}
+        self.tensorCache = {}
+        self.groupedCache = {}
+        self.lastRun = None
+
+class InflectionIndex:
+    """
+    An index over a list of inflections for drilling down into the results. The inflections are grouped by (merchant,
+    panel, type), and within each group they are kept sorted by date alongside a NumPy array of the dates, so a date range
+    is found with two binary searches. For the top-severity queries (severity being the size of the second derivative) we
+    also keep a sparse table of range maxima for each group, which finds the most severe inflection in any date range in
+    constant time.
+    """
+    def __init__(self,inflections):
+        groups = {}
+        for x in inflections:
+            groups.setdefault((x.merchant,x.panel,x.ttype),[]).append(x)
+        self.series = {}
+        for key,items in groups.items():
+            dates = pd.to_datetime([x.date for x in items]).to_numpy()
+            order = np.argsort(dates,kind = "stable")
+            items = [items[i] for i in order]
+            severity = np.abs(np.array([x.secondDerivValue for x in items],dtype = float))
+            self.series[key] = (dates[order],items,severity,self.buildSparseTable(severity))
+
+    """
+    Level j of the sparse table holds, for every position i, the position of the largest value in [i, i + 2^j).
+    """
+    def buildSparseTable(self,values):
+        table = [np.arange(len(values),dtype = np.int32)]
+        width = 1
+        while 2*width <= len(values):
+            previous = table[-1]
+            left = previous[:len(values) - 2*width + 1]
+            right = previous[width:len(values) - width + 1]
+            table.append(np.where(values[right] > values[left],right,left))
+            width *= 2
+        return table
+
+    """
+    Position of the largest value in [lo, hi), read off the two overlapping blocks of the sparse table that cover it.
+    """
+    def rangeMax(self,key,lo,hi):
+        severity,table = self.series[key][2],self.series[key][3]
+        level = (hi - lo).bit_length() - 1
+        left = table[level][lo]
+        right = table[level][hi - (1 << level)]
+        return int(right) if severity[right] > severity[left] else int(left)
+
+    """
+    Helper function that converts a date range into the [lo, hi) positions it covers for a series. Either end can be left
+    out, and both ends are inclusive.
+    """
+    def positions(self,key,start=None,end=None):
+        dates = self.series[key][0]
+        lo = 0 if start is None else int(np.searchsorted(dates,np.datetime64(pd.Timestamp(start)).astype(dates.dtype),"left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates,np.datetime64(pd.Timestamp(end)).astype(dates.dtype),"right"))
+        return lo,max(lo,hi)
+
+    """
+    Returns the (merchant, panel, type) groups in the index.
+    """
+    def keys(self):
+        return list(self.series.keys())
+
+    """
+    Returns the inflections for a merchant, panel and type between start and end (inclusive), in date order. Use
+    "Not Applicable" for the panel or type when the inflections came from a partition that did not split on it.
+    """
+    def query(self,merchant,panel,ttype,start=None,end=None):
+        key = (merchant,panel,ttype)
+        if key not in self.series:
+            return []
+        lo,hi = self.positions(key,start,end)
+        return self.series[key][1][lo:hi]
+
+    """
+    Returns how many inflections a merchant, panel and type has between start and end, without building the list.
+    """
+    def count(self,merchant,panel,ttype,start=None,end=None):
+        key = (merchant,panel,ttype)
+        if key not in self.series:
+            return 0
+        lo,hi = self.positions(key,start,end)
+        return hi - lo
+
+    """
+    Returns the k most severe inflections for a merchant, panel and type between start and end, most severe first. We keep
+    a heap of date ranges ordered by their most severe inflection: taking the top of the heap gives the next answer, and
+    the two ranges on either side of it are pushed back on.
+    """
+    def topSeverity(self,merchant,panel,ttype,start=None,end=None,k=10):
+        key = (merchant,panel,ttype)
+        if key not in self.series:
+            return []
+        items,severity = self.series[key][1],self.series[key][2]
+        lo,hi = self.positions(key,start,end)
+        heap = []
+        if lo < hi:
+            i = self.rangeMax(key,lo,hi)
+            heap.append((-severity[i],i,lo,hi))
+        result = []
+        while heap and len(result) < k:
+            s,i,lo,hi = heapq.heappop(heap)
+            result.append(items[i])
+            for a,b in ((lo,i),(i + 1,hi)):
+                if a < b:
+                    j = self.rangeMax(key,a,b)
+                    heapq.heappush(heap,(-severity[j],j,a,b))
+        return result
 
 
 # # Part 4: Results and Analysis
@@ -625,9 +1265,8 @@ plt.plot(netflix_test.FixedDate.dt.day,netflix_test.Sales)
 plt.show()
 
 #Below the graph, print out the inflection points that were detected for this period.
-filtered_inflections = list(filter(
-        lambda x: (x.merchant == "Netflix" and x.date.year == 2015 and x.date.month == 1
-                   and x.panel == "PANEL_1" and x.ttype == "CREDIT"), inflections))
+index = InflectionIndex(inflections)
+filtered_inflections = index.query("Netflix","PANEL_1","CREDIT","2015-01-01","2015-01-31")
 
 print("Identified inflection points are:")
 for i in filtered_inflections:
@@ -680,9 +1319,8 @@ plt.plot(netflix_test.FixedDate.dt.day,netflix_test.Sales)
 plt.show()
 
 #Below the graph, print out the inflection points that were detected for this period.
-filtered_inflections = list(filter(
-        lambda x: (x.merchant == "Netflix" and x.date.year == 2015 and x.date.month == 1
-                   and x.panel == "PANEL_1" and x.ttype == "CREDIT"), inflections))
+index = InflectionIndex(inflections)
+filtered_inflections = index.query("Netflix","PANEL_1","CREDIT","2015-01-01","2015-01-31")
 
 print("Identified inflection points are:")
 for i in filtered_inflections:
@@ -727,30 +1365,22 @@ for i in filtered_inflections:
 
 #Function for analyzing inflection points.
 def CalculateInflectionStatistics(inflections,analysisObject):
-    d = {}
-    
-    merchants = set(analysisObject.merchants)
-    panels = set(analysisObject.panels) | set(["Not Applicable"])
-    types = set(analysisObject.ttypes) | set(["Not Applicable"])
-    
-    for m in analysisObject.merchants:
-        for p in panels:
-            for t in types:
-                inflectionTotal = 0
-                maxInflectionStreak = 0
-                inflectionStreakSum = 0
-                for i in filter(lambda x: x.merchant == m and x.ttype == t and x.panel == p,inflections):
-                    inflectionTotal += 1
-                    inflectionStreakSum += i.streak
-                    if i.streak > maxInflectionStreak:
-                        maxInflectionStreak = i.streak
-                    key = m + '-' + p + '-' + t
-                    d[key] = (
-                        inflectionTotal,
-                        maxInflectionStreak,
-                        inflectionStreakSum/inflectionTotal if inflectionTotal > 0 else -1
-                    )
-    return d
+    approach,partition = analysisObject.lastRun[0:2] if analysisObject.lastRun else ("","")
+    with analysisObject.profile.stage("statistics",approach,partition,len(inflections)):
+        #a single pass over the inflections, accumulating the total, max streak and streak sum per series.
+        totals = {}
+        for i in inflections:
+            key = i.merchant + '-' + i.panel + '-' + i.ttype
+            inflectionTotal,maxInflectionStreak,inflectionStreakSum = totals.get(key,(0,0,0))
+            totals[key] = (inflectionTotal + 1,max(maxInflectionStreak,i.streak),inflectionStreakSum + i.streak)
+        d = {}
+        for key,(inflectionTotal,maxInflectionStreak,inflectionStreakSum) in totals.items():
+            d[key] = (
+                inflectionTotal,
+                maxInflectionStreak,
+                inflectionStreakSum/inflectionTotal if inflectionTotal > 0 else -1
+            )
+        return d
             
 analysis = InflectionAnalysis("C:/Users/rg255/Downloads/Inflections.csv")
 allResults = []
@@ -958,3 +1588,147 @@ SixFlags[["Approach","Partition","Merchant","Panel","Type","NumInflections"]]
 # Second, one can leverage the streak field that was stored in the Inflection class to get some idea as to how gradual an inflection point is in time. On its own it can tell us how long a sales curve remains concave or convex, but technically, one could still have a sudden change in concavity despite the regularity preceding the change. Hence, streak on its own is not so useful. However, if we combine the streak field with a running _percent change_ field for the second derivative, we may be able to arrive at a better metric for determining how gradual or sudden an inflection point is.
 # 
 # Overall, this is a complex task that can benefit from more attention.
+# 
+# # Appendix: Synthetic Data and Benchmarks
+# 
+# The code in this document can only be run against the original Inflections.csv file. To test it on other data, and in particular to see how it copes with far more merchants than the 25 in that file, we need a way of generating data with the same Date/Merchant/Panel/Type/Sales layout.
+# 
+# The generator below builds, for every merchant, four daily series (two panels and two transaction types) made of a base level, a small trend, a weekly cycle and multiplicative noise. On top of that it injects a number of _regime changes_ per merchant: days on which the level of sales jumps and the trend changes. These are the kind of events we would hope to find as inflection points, so the generator also returns a table of where it put them. Dates are written without leading zeros, like the original file, so that fixDate is exercised too. Days can also be dropped at random to mimic the missing data we saw for some merchants.
+
+# In[524]:
+
+
+#Function for generating synthetic sales data in the same layout as Inflections.csv.
+def generateSyntheticSales(numMerchants=25,years=5,noise=0.05,regimeChanges=3,missingDays=0.0,seed=0,startYear=2015):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("{0}-01-01".format(startYear),"{0}-12-31".format(startYear + years - 1),freq = "D")
+    merchants = ["Merchant_{0:05d}".format(i) for i in range(numMerchants)]
+    numSeries = 4*numMerchants
+    day = np.arange(len(dates))
+
+    #the base level, trend and weekly cycle of every series.
+    level = np.log(rng.lognormal(mean = 8,sigma = 1,size = (numSeries,1)))
+    trend = rng.normal(0,0.0005,size = (numSeries,1))*day
+    weekly = 1 + 0.1*np.sin(2*np.pi*day/7 + rng.uniform(0,2*np.pi,size = (numSeries,1)))
+
+    #regime changes are shared by the four series of a merchant.
+    changeDays = rng.integers(1,len(dates),size = (numMerchants,regimeChanges))
+    levelChanges = rng.normal(0,0.3,size = (numMerchants,regimeChanges))
+    slopeChanges = rng.normal(0,0.002,size = (numMerchants,regimeChanges))
+    regime = np.zeros((numMerchants,len(dates)))
+    for c in range(regimeChanges):
+        after = day >= changeDays[:,c:c + 1]
+        regime += after*(levelChanges[:,c:c + 1] + slopeChanges[:,c:c + 1]*(day - changeDays[:,c:c + 1]))
+
+    sales = np.exp(level + trend + np.repeat(regime,4,axis = 0))*weekly
+    sales = np.round(np.maximum(sales*(1 + noise*rng.standard_normal(sales.shape)),0),2)
+
+    #drop days at random, and lay the rest out one row per series and day.
+    series,kept = np.nonzero(rng.random(sales.shape) >= missingDays)
+    dateStrings = ["{0}/{1}/{2}".format(d.month,d.day,d.year) for d in dates]
+    data = pd.DataFrame({
+        "Date": pd.Categorical.from_codes(kept,dateStrings),
+        "Merchant": pd.Categorical.from_codes(series//4,merchants),
+        "Panel": pd.Categorical.from_codes((series//2) % 2,["PANEL_1","PANEL_2"]),
+        "Type": pd.Categorical.from_codes(series % 2,["CREDIT","DEBIT"]),
+        "Sales": sales[series,kept]
+    })
+    changes = pd.DataFrame({
+        "Merchant": np.repeat(merchants,regimeChanges),
+        "FixedDate": dates[changeDays.ravel()],
+        "LevelChange": levelChanges.ravel(),
+        "SlopeChange": slopeChanges.ravel()
+    })
+    return data,changes
+
+
+# With synthetic data available, we can benchmark the analysis. For each number of merchants, the function below generates a dataset, loads it, and then times every combination of backend, approach and partition, along with CalculateInflectionStatistics on the result. For each one it reports the time taken, the throughput in rows of data per second, and the peak memory allocated while it ran (from tracemalloc, which does slow things down a little, but in the same way every time).
+# 
+# To catch regressions, the results can be compared against a baseline file from an earlier run: the Ratio column is the time taken divided by the baseline time, and Slower flags the cases that got more than 25% slower. Passing saveBaseline = True writes the current results as the new baseline. Note that the timings depend on the machine, so a baseline is only meaningful on the machine that recorded it.
+
+# In[525]:
+
+
+import tracemalloc
+
+def benchmarkInflections(sizes=[25,1000,10000],years=1,approaches=["forward","backward","3point","5point"],
+                         partitions=["none","panel","ttype","all"],backends=["pandas","tensor"],baselineFile=None,
+                         saveBaseline=False,tolerance=1.25,seed=0):
+    results = []
+    for numMerchants in sizes:
+        data,changes = generateSyntheticSales(numMerchants = numMerchants,years = years,seed = seed)
+        tracemalloc.start()
+        started = time.perf_counter()
+        analysis = InflectionAnalysis(data)
+        loadSeconds = time.perf_counter() - started
+        results.append({"Merchants":numMerchants,"Backend":"","Approach":"load","Partition":"","Rows":len(data),
+                        "Inflections":0,"DetectSeconds":loadSeconds,"StatisticsSeconds":0.0,
+                        "RowsPerSecond":len(data)/loadSeconds,"PeakMB":tracemalloc.get_traced_memory()[1]/2**20})
+        for backend in backends:
+            for approach in approaches:
+                for partition in partitions:
+                    tracemalloc.reset_peak()
+                    started = time.perf_counter()
+                    analysis.detectInflections(approach = approach,partition = partition,backend = backend)
+                    detectSeconds = time.perf_counter() - started
+                    started = time.perf_counter()
+                    CalculateInflectionStatistics(analysis.inflections,analysis)
+                    statisticsSeconds = time.perf_counter() - started
+                    results.append({"Merchants":numMerchants,"Backend":backend,"Approach":approach,"Partition":partition,
+                                    "Rows":len(data),"Inflections":len(analysis.inflections),
+                                    "DetectSeconds":detectSeconds,"StatisticsSeconds":statisticsSeconds,
+                                    "RowsPerSecond":len(data)/(detectSeconds + statisticsSeconds),
+                                    "PeakMB":tracemalloc.get_traced_memory()[1]/2**20})
+        tracemalloc.stop()
+    report = pd.DataFrame(results)
+
+    #compare against the baseline, keyed by size, backend, approach and partition.
+    keys = ["Merchants","Backend","Approach","Partition"]
+    if baselineFile is not None and not saveBaseline:
+        with open(baselineFile) as f:
+            baseline = pd.DataFrame(json.load(f))
+        baseline["BaselineSeconds"] = baseline.DetectSeconds + baseline.StatisticsSeconds
+        report = report.merge(baseline[keys + ["BaselineSeconds"]],on = keys,how = "left")
+        report["Ratio"] = (report.DetectSeconds + report.StatisticsSeconds)/report.BaselineSeconds
+        report["Slower"] = report.Ratio > tolerance
+    if baselineFile is not None and saveBaseline:
+        with open(baselineFile,"w") as f:
+            json.dump(results,f,indent = 2)
+    return report
+
+
+# In[526]:
+
+
+#A quick run on the 25 merchant case. The full suite is benchmarkInflections(), but with the pandas backend the 10k
+#merchant case takes a long time.
+benchmark = benchmarkInflections(sizes = [25])
+benchmark
+
+
+# loadChunked combines its partial sums as it goes, so it is worth checking the worst case for that: a file where nearly every row is a group of its own, which is exactly what the synthetic data gives. Reading it in small chunks should give the same totals as reading it in one go, and should not take much longer than never combining at all.
+
+# In[527]:
+
+
+import os
+import tempfile
+
+def checkChunkedLoad(numMerchants=300,chunksize=10000):
+    data,changes = generateSyntheticSales(numMerchants = numMerchants,years = 1)
+    fileName = os.path.join(tempfile.mkdtemp(),"synthetic.csv")
+    data.to_csv(fileName,index = False)
+    analysis = InflectionAnalysis(data.head(10))
+    whole = analysis.loadChunked(fileName,chunksize = len(data) + 1)
+    started = time.perf_counter()
+    chunked = analysis.loadChunked(fileName,chunksize = chunksize)
+    chunkedSeconds = time.perf_counter() - started
+    started = time.perf_counter()
+    analysis.loadChunked(fileName,chunksize = chunksize,maxPartialRows = float("inf"))
+    uncombinedSeconds = time.perf_counter() - started
+    assert whole.equals(chunked),"reading in chunks changed the totals"
+    assert chunkedSeconds < 3*uncombinedSeconds,"combining the partial sums took {0:.1f}s against {1:.1f}s".format(
+        chunkedSeconds,uncombinedSeconds)
+    return len(data),chunkedSeconds,uncombinedSeconds
+
+checkChunkedLoad()